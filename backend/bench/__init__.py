@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the RAG pipeline
+Run from backend/: python -m bench.<name>
+"""
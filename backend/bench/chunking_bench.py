@@ -0,0 +1,170 @@
+"""
+Chunking Benchmark
+Character chunking vs semantic chunking: chunk counts, ingest time and topic coherence
+
+Usage:
+    python -m bench.chunking_bench --embedder model --pages 100
+    python -m bench.chunking_bench --embedder hash --pages 300 --reencode 0 0.6 --out chunking.json
+
+Synthetic pages are run-on paragraphs on known topics (bench.synthetic.
+topical_pages), so every chunk can be scored against the ground truth.
+Each strategy produces chunks and one vector per chunk:
+    chars              TextChunker(400, 80), every chunk embedded
+    semantic           SemanticChunker, sentence vectors pooled (one embedding pass)
+    semantic_reencode  SemanticChunker with SEMANTIC_REENCODE_BELOW = each --reencode value
+    semantic_twopass   sentences embedded for boundaries, then every chunk embedded
+                       again (what pooling avoids)
+
+Reported per strategy:
+    chunks / mean_chars / overlap_chars  chunk count, size, text indexed more than once
+    embedded_texts / embedded_chars       embedding work
+    ingest_s                              chunk + embed wall time (median of --repeat)
+    purity                                share of a chunk's characters in its main topic
+    topic_hit_at_k                        share of top-k results, for a fresh sentence on
+                                          a topic, whose main topic is that topic
+"""
+
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from typing import Dict, List
+
+from bench import synthetic
+from bench.fakes import HashEmbedder
+from rag.chunker import TextChunker, SemanticChunker
+
+
+class CountingEmbedder:
+    """Wraps an embedder and counts what it is asked to embed"""
+
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.embedding_dim = embedder.embedding_dim
+        self.texts = 0
+        self.chars = 0
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        self.texts += len(texts)
+        self.chars += sum(len(t) for t in texts)
+        return self.embedder.embed_texts(texts)
+
+
+def char_strategy(embedder, pages):
+    chunks = TextChunker(chunk_size=400, overlap=80).create_chunks(pages)
+    vectors = embedder.embed_texts([c["text"] for c in chunks])
+    return chunks, vectors
+
+
+def semantic_strategy(reencode_below: float = 0.0, twopass: bool = False):
+    def run(embedder, pages):
+        chunks, vectors = SemanticChunker(embedder, reencode_below=reencode_below).create_chunks(pages)
+        if twopass:
+            vectors = embedder.embed_texts([c["text"] for c in chunks])
+        return chunks, vectors
+    return run
+
+
+def chunk_topics(chunks, labels: List[List[tuple]]) -> Dict:
+    """Main topic of each chunk and the share of its characters in that topic"""
+    main_topics, purities = [], []
+    for chunk in chunks:
+        counts = {}
+        for start, end, topic in labels[chunk["page"] - 1]:
+            overlap = min(end, chunk["char_end"]) - max(start, chunk["char_start"])
+            if overlap > 0:
+                counts[topic] = counts.get(topic, 0) + overlap
+        topic = max(counts, key=counts.get)
+        main_topics.append(topic)
+        purities.append(counts[topic] / sum(counts.values()))
+    return {"topics": np.asarray(main_topics), "purity": float(np.mean(purities))}
+
+
+def topic_hits(vectors: np.ndarray, topics: np.ndarray, queries: np.ndarray, query_topics: List[int], top_k: int) -> float:
+    normed = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    scores = queries @ normed.T
+    top = np.argsort(-scores, axis=1)[:, :top_k]
+    return float(np.mean(topics[top] == np.asarray(query_topics)[:, None]))
+
+
+def run_strategy(name: str, fn, embedder, pages, labels, queries, query_topics, repeat: int, top_k: int) -> Dict:
+    runs = []
+    for _ in range(repeat):
+        counting = CountingEmbedder(embedder)
+        t0 = time.perf_counter()
+        chunks, vectors = fn(counting, pages)
+        runs.append(time.perf_counter() - t0)
+
+    sizes = [c["char_end"] - c["char_start"] for c in chunks]
+    page_chars = sum(len(p["text"]) for p in pages)
+    scored = chunk_topics(chunks, labels)
+    return {
+        "strategy": name,
+        "chunks": len(chunks),
+        "mean_chars": round(float(np.mean(sizes)), 1),
+        "overlap_chars": max(sum(sizes) - page_chars, 0),
+        "embedded_texts": counting.texts,
+        "embedded_chars": counting.chars,
+        "ingest_s": round(float(np.median(runs)), 4),
+        "purity": round(scored["purity"], 4),
+        "topic_hit_at_k": round(topic_hits(np.asarray(vectors), scored["topics"], queries, query_topics, top_k), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--topics", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--reencode", type=float, nargs="*", default=[0.6], help="SEMANTIC_REENCODE_BELOW values")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="model: configured EmbeddingGenerator; hash: deterministic stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    if args.embedder == "hash":
+        embedder = HashEmbedder()
+    else:
+        from rag.embedder import EmbeddingGenerator
+        embedder = EmbeddingGenerator()
+
+    pages, labels = synthetic.topical_pages(args.pages, args.words_per_page, args.topics, seed=args.seed)
+    # Queries: fresh sentences on a known topic
+    query_pages, query_labels = synthetic.topical_pages(args.queries, 1, args.topics, seed=args.seed + 1)
+    query_texts = [p["text"].split(". ")[0] for p in query_pages]
+    query_topics = [spans[0][2] for spans in query_labels]
+    queries = np.asarray(embedder.embed_texts(query_texts), dtype=np.float32)
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+    strategies = [("chars", char_strategy), ("semantic", semantic_strategy())]
+    strategies += [(f"semantic_reencode_{r:g}", semantic_strategy(reencode_below=r)) for r in args.reencode if r > 0]
+    strategies.append(("semantic_twopass", semantic_strategy(twopass=True)))
+
+    report = {
+        "meta": {
+            "embedder": getattr(embedder, "mode", type(embedder).__name__),
+            "pages": len(pages),
+            "page_chars": sum(len(p["text"]) for p in pages),
+            "params": vars(args),
+        },
+        "strategies": [
+            run_strategy(name, fn, embedder, pages, labels, queries, query_topics, args.repeat, args.top_k)
+            for name, fn in strategies
+        ],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Fake LLM Server
+Local OpenAI-compatible stand-in for OpenAI / Groq with injectable latency and failures
+
+Usage:
+    python -m bench.fake_llm --port 8900 --latency-ms 300 --jitter-ms 100 --error-rate 0.0
+
+Then point the backend at it:
+    OPENAI_API_KEY=sk-local OPENAI_BASE_URL=http://127.0.0.1:8900/v1
+    # or GROQ_API_KEY=gsk-local GROQ_BASE_URL=http://127.0.0.1:8900
+
+Latency can be changed while running to simulate a degrading provider:
+    curl -X POST localhost:8900/_control -d '{"latency_ms": 5000, "error_rate": 0.5}'
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMConfig:
+    def __init__(self, latency_ms: float = 300.0, jitter_ms: float = 0.0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def update(self, values: dict):
+        with self.lock:
+            for key in ("latency_ms", "jitter_ms", "error_rate"):
+                if key in values:
+                    setattr(self, key, float(values[key]))
+
+
+def make_handler(config: FakeLLMConfig):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path == "/_control":
+                config.update(payload)
+                return self._send_json(200, {"status": "ok"})
+
+            if not self.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            with config.lock:
+                config.requests += 1
+                delay = max(0.0, config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+                fail = random.random() < config.error_rate
+            time.sleep(delay)
+
+            if fail:
+                return self._send_json(500, {"error": {"message": "injected failure", "type": "server_error"}})
+
+            question = payload.get("messages", [{}])[-1].get("content", "")
+            answer = f"Stand-in answer ({len(question)} prompt chars)."
+            self._send_json(200, {
+                "id": f"chatcmpl-fake-{config.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": answer},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(question) // 4, "completion_tokens": 8, "total_tokens": len(question) // 4 + 8},
+            })
+
+    return Handler
+
+
+def serve(port: int = 8900, config: FakeLLMConfig = None) -> ThreadingHTTPServer:
+    """Start the fake server on a daemon thread and return it"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config or FakeLLMConfig()))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(args.latency_ms, args.jitter_ms, args.error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(config))
+    print(f"Fake LLM listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark Stand-ins
+Local replacements for the external services the pipeline talks to:
+- Pinecone -> the in-process LocalVectorIndex (VECTOR_BACKEND=local)
+- OpenAI / Groq -> bench.fake_llm HTTP server (OPENAI_BASE_URL)
+- EmbeddingGenerator -> HashEmbedder when no model is available offline
+"""
+
+import hashlib
+import os
+import socket
+import time
+import numpy as np
+from typing import List
+
+from bench.fake_llm import FakeLLMConfig, serve
+
+
+class HashEmbedder:
+    """
+    Deterministic bag-of-words embedder with the EmbeddingGenerator surface
+
+    Shared words give shared dimensions, so retrieval still behaves sensibly.
+    latency_ms / per_item_ms simulate a remote embedding API.
+    """
+
+    mode = "hash"
+
+    def __init__(self, embedding_dim: int = 384, latency_ms: float = 0.0, per_item_ms: float = 0.0):
+        self.embedding_dim = embedding_dim
+        self.latency_ms = latency_ms
+        self.per_item_ms = per_item_ms
+
+    def _vector(self, text: str) -> np.ndarray:
+        v = np.zeros(self.embedding_dim, dtype=np.float32)
+        for word in text.lower().split():
+            h = int.from_bytes(hashlib.md5(word.encode("utf-8")).digest()[:4], "little")
+            v[h % self.embedding_dim] += 1.0 if h & (1 << 31) else -1.0
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            raise ValueError("Cannot embed empty text list")
+        delay = self.latency_ms + self.per_item_ms * len(texts)
+        if delay:
+            time.sleep(delay / 1000)
+        return np.stack([self._vector(t) for t in texts])
+
+    def embed_query(self, query: str) -> np.ndarray:
+        return self.embed_texts([query])[0]
+
+    def warm_up(self):
+        pass
+
+
+class SlowIndex:
+    """
+    Wraps a vector index (LocalVectorIndex) and adds network-like latency
+    to query / upsert / delete, to stand in for a remote Pinecone index
+    """
+
+    def __init__(self, index, query_ms: float = 0.0, upsert_ms: float = 0.0):
+        self._index = index
+        self.query_ms = query_ms
+        self.upsert_ms = upsert_ms
+
+    def query(self, *args, **kwargs):
+        if self.query_ms:
+            time.sleep(self.query_ms / 1000)
+        return self._index.query(*args, **kwargs)
+
+    def query_many(self, *args, **kwargs):
+        # One round trip for the whole batch
+        if self.query_ms:
+            time.sleep(self.query_ms / 1000)
+        return self._index.query_many(*args, **kwargs)
+
+    def upsert(self, *args, **kwargs):
+        if self.upsert_ms:
+            time.sleep(self.upsert_ms / 1000)
+        return self._index.upsert(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        if self.upsert_ms:
+            time.sleep(self.upsert_ms / 1000)
+        return self._index.delete(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def use_local_backends(data_dir: str, llm_latency_ms: float = 50.0, llm_jitter_ms: float = 0.0, llm_error_rate: float = 0.0) -> FakeLLMConfig:
+    """
+    Point the backend at local stand-ins; call before importing main
+
+    Starts the fake LLM server on a free port and returns its config, which
+    can be mutated while running to inject latency or failures.
+    """
+    config = FakeLLMConfig(latency_ms=llm_latency_ms, jitter_ms=llm_jitter_ms, error_rate=llm_error_rate)
+    port = free_port()
+    serve(port, config)
+
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["VECTOR_BACKEND"] = "local"
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ.pop("GROQ_API_KEY", None)
+    os.environ.pop("PINECONE_API_KEY", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return config
@@ -0,0 +1,253 @@
+"""
+Load Test
+Concurrent /ask users alongside /upload traffic, with latency SLO reporting
+
+Usage (in-process app, fake backends):
+    python -m bench.load_test --concurrency 32 --duration-s 60 --uploaders 1 \\
+        --llm-latency-ms 400 --llm-jitter-ms 150 --search-latency-ms 20 --slo-p95-ms 1500
+
+Against a running server (configure its fakes via env, see bench.fake_llm):
+    python -m bench.load_test --url http://127.0.0.1:8000 --concurrency 16
+
+Each of --concurrency virtual users loops: pick a question (retrieval and
+tabular mix), attach a history of a length drawn from --history-lengths,
+POST /ask, optionally think, repeat. --uploaders workers re-upload a
+synthetic PDF for the whole run, so /ask is measured under ingest load.
+
+The report (JSON) gives, per route: requests, errors, error rate,
+throughput, latency percentiles, status-code counts and the SLO verdict.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+from bench import synthetic
+from bench.fakes import HashEmbedder, SlowIndex, use_local_backends
+
+FOLLOW_UPS = ["And the price?", "Tell me more", "Why is that?", "Which one is best?", "What about stock?"]
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def record(self, elapsed_ms: float, status):
+        self.latencies_ms.append(elapsed_ms)
+        self.statuses[str(status)] += 1
+        if status != 200:
+            self.errors += 1
+
+    def report(self, wall_s: float, slo_p95_ms: float = None) -> Dict:
+        n = len(self.latencies_ms)
+        out = {
+            "requests": n,
+            "errors": self.errors,
+            "error_rate": round(self.errors / n, 4) if n else 0.0,
+            "throughput_rps": round(n / wall_s, 2) if wall_s else 0.0,
+            "statuses": dict(self.statuses),
+        }
+        if n:
+            arr = np.asarray(self.latencies_ms)
+            for q in (50, 90, 95, 99):
+                out[f"p{q}_ms"] = round(float(np.percentile(arr, q)), 2)
+            out["max_ms"] = round(float(arr.max()), 2)
+        if slo_p95_ms is not None and n:
+            out["slo_p95_ms"] = slo_p95_ms
+            out["slo_met"] = out["p95_ms"] <= slo_p95_ms
+        return out
+
+
+def make_history(rng: random.Random, length: int) -> List[Dict]:
+    history = []
+    for i in range(length):
+        if i % 2 == 0:
+            history.append({"role": "user", "content": synthetic.questions(1, seed=rng.randrange(1 << 30))[0]})
+        else:
+            history.append({"role": "assistant", "content": synthetic.sentence(rng)})
+    return history
+
+
+async def ask_user(client: httpx.AsyncClient, user_id: int, args, deadline: float, stats: RouteStats, recording):
+    rng = random.Random(args.seed * 1000 + user_id)
+    history_lengths = args.history_lengths
+    questions = synthetic.questions(200, seed=args.seed * 1000 + user_id)
+    while time.perf_counter() < deadline:
+        length = rng.choice(history_lengths)
+        history = make_history(rng, length)
+        # Short follow-ups when there is history, so condensing kicks in
+        question = rng.choice(FOLLOW_UPS) if length and rng.random() < 0.5 else rng.choice(questions)
+        payload = {"question": question, "history": history, "currentUrl": args.tenant}
+
+        t0 = time.perf_counter()
+        try:
+            r = await client.post("/ask", json=payload, timeout=args.timeout_s)
+            status = r.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if recording():
+            stats.record((time.perf_counter() - t0) * 1000, status)
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+
+
+async def uploader(client: httpx.AsyncClient, worker_id: int, pdf_bytes: bytes, args, deadline: float, stats: RouteStats, recording):
+    n = 0
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            r = await client.post(
+                "/upload",
+                files={"file": (f"load-{worker_id}-{n}.pdf", pdf_bytes, "application/pdf")},
+                data={"currentUrl": f"{args.tenant}-upload-{worker_id}", "reindex": "false"},
+                timeout=args.timeout_s * 4,
+            )
+            status = r.status_code
+        except httpx.TimeoutException:
+            status = "timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if recording():
+            stats.record((time.perf_counter() - t0) * 1000, status)
+        n += 1
+        if args.upload_interval_s:
+            await asyncio.sleep(args.upload_interval_s)
+
+
+async def seed_tenant(client: httpx.AsyncClient, args, pdf_bytes: bytes, csv_bytes: bytes):
+    for name, data, mime in (("seed.pdf", pdf_bytes, "application/pdf"), ("seed.csv", csv_bytes, "text/csv")):
+        r = await client.post("/upload", files={"file": (name, data, mime)}, data={"currentUrl": args.tenant}, timeout=300)
+        r.raise_for_status()
+
+
+async def drive(client: httpx.AsyncClient, args, pdf_bytes: bytes, csv_bytes: bytes) -> Dict:
+    if not args.no_seed:
+        await seed_tenant(client, args, pdf_bytes, csv_bytes)
+
+    ask_stats, upload_stats = RouteStats(), RouteStats()
+    start = time.perf_counter()
+    measure_from = start + args.warmup_s
+    deadline = measure_from + args.duration_s
+    recording = lambda: time.perf_counter() >= measure_from
+
+    tasks = [ask_user(client, i, args, deadline, ask_stats, recording) for i in range(args.concurrency)]
+    tasks += [uploader(client, i, pdf_bytes, args, deadline, upload_stats, recording) for i in range(args.uploaders)]
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - measure_from
+
+    return {
+        "ask": ask_stats.report(wall, args.slo_p95_ms),
+        "upload": upload_stats.report(wall),
+        "wall_s": round(wall, 2),
+    }
+
+
+async def run_in_process(args, workdir: str, pdf_bytes: bytes, csv_bytes: bytes) -> Dict:
+    llm = use_local_backends(
+        os.path.join(workdir, "data"),
+        llm_latency_ms=args.llm_latency_ms, llm_jitter_ms=args.llm_jitter_ms, llm_error_rate=args.llm_error_rate,
+    )
+    # Imported late: main reads DATA_DIR / VECTOR_BACKEND / LLM env at import
+    import main
+
+    embedder = HashEmbedder(latency_ms=args.embed_latency_ms, per_item_ms=args.embed_per_item_ms)
+    main.EmbeddingGenerator = lambda: embedder
+
+    async with main.lifespan(main.app):
+        # Startup returns at once and warms models in the background
+        await asyncio.to_thread(main.warmup_done.wait)
+        if not main.warmup_state["ready"]:
+            raise RuntimeError(f"Warm-up failed: {main.warmup_state['error']}")
+        main.global_vector_store.index = SlowIndex(
+            main.global_vector_store.index, query_ms=args.search_latency_ms, upsert_ms=args.upsert_latency_ms
+        )
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load-test") as client:
+            report = await drive(client, args, pdf_bytes, csv_bytes)
+        report["fake_llm_requests"] = llm.requests
+        report["coalescing"] = main.ask_single_flight.snapshot()
+        report["stage_breakdown"] = main.REGISTRY.stage_summary()
+    return report
+
+
+async def run_remote(args, pdf_bytes: bytes, csv_bytes: bytes) -> Dict:
+    limits = httpx.Limits(max_connections=args.concurrency + args.uploaders + 4)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        return await drive(client, args, pdf_bytes, csv_bytes)
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent /ask users")
+    parser.add_argument("--duration-s", type=float, default=30.0)
+    parser.add_argument("--warmup-s", type=float, default=3.0, help="Requests in this window are not recorded")
+    parser.add_argument("--history-lengths", type=int, nargs="+", default=[0, 0, 0, 2, 4],
+                        help="History length is drawn uniformly from this list per request")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Mean pause between a user's requests")
+    parser.add_argument("--uploaders", type=int, default=1, help="Concurrent upload workers (0 = ask only)")
+    parser.add_argument("--upload-interval-s", type=float, default=0.0, help="Pause between an uploader's requests")
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the uploaded synthetic PDF")
+    parser.add_argument("--rows", type=int, default=500, help="Rows in the seeded synthetic CSV")
+    parser.add_argument("--tenant", default="load")
+    parser.add_argument("--no-seed", action="store_true", help="Don't upload seed documents first")
+    parser.add_argument("--timeout-s", type=float, default=30.0)
+    parser.add_argument("--slo-p95-ms", type=float, help="Mark the run as failing if /ask p95 exceeds this")
+    parser.add_argument("--seed", type=int, default=0)
+    # Fake backend latency (in-process mode only)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0.0, help="Per embedding call")
+    parser.add_argument("--embed-per-item-ms", type=float, default=0.0, help="Per embedded text")
+    parser.add_argument("--search-latency-ms", type=float, default=0.0, help="Per vector query")
+    parser.add_argument("--upsert-latency-ms", type=float, default=0.0, help="Per upsert / delete batch")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rag-load-")
+    try:
+        pdf_bytes = read_bytes(synthetic.make_pdf(os.path.join(workdir, "load.pdf"), args.pages, seed=args.seed))
+        csv_bytes = read_bytes(synthetic.make_csv(os.path.join(workdir, "load.csv"), args.rows, seed=args.seed))
+        if args.url:
+            report = asyncio.run(run_remote(args, pdf_bytes, csv_bytes))
+        else:
+            report = asyncio.run(run_in_process(args, workdir, pdf_bytes, csv_bytes))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report["params"] = vars(args)
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.slo_p95_ms is not None and not report["ask"].get("slo_met", True):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Pipeline Benchmark
+Throughput of each ingestion stage and end-to-end /upload and /ask latency
+
+Usage:
+    python -m bench.pipeline_bench --pages 50 --rows 2000 --repeat 5 --out before.json
+    python -m bench.pipeline_bench --embedder hash      # no model download needed
+
+Reports (JSON):
+    extract_pdf   pages/s       PDFLoader.extract_text
+    extract_csv   rows/s        CSVLoader.extract_csv
+    chunk         chunks/s      TextChunker.create_chunks
+    embed         embeddings/s  EmbeddingGenerator.embed_texts (or HashEmbedder)
+    upload_pdf / upload_csv / ask   end-to-end latency percentiles (ms)
+
+Fully offline and reproducible: inputs are generated from a seed, Pinecone
+is replaced by the local index and the LLM by bench.fake_llm (fixed latency).
+Compare two runs by diffing their JSON files.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from typing import Callable, Dict, List
+
+from bench import synthetic
+from bench.fakes import HashEmbedder, use_local_backends
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": len(arr),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+    }
+
+
+def timed(fn: Callable, repeat: int, warmup: int = 1):
+    """Run fn warmup + repeat times; returns (last result, per-run seconds)"""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - t0)
+    return result, runs
+
+
+def throughput(items: int, runs: List[float], unit: str) -> Dict:
+    median = float(np.median(runs))
+    return {
+        "items": items,
+        f"{unit}_per_s": round(items / median, 2) if median else None,
+        "median_s": round(median, 6),
+        "min_s": round(min(runs), 6),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "unknown"
+
+
+def bench_stages(pdf_path: str, csv_path: str, embedder, repeat: int, embed_sample: int) -> Dict:
+    from rag.loader import PDFLoader, CSVLoader
+    from rag.chunker import TextChunker
+
+    pages, runs = timed(lambda: PDFLoader().extract_text(pdf_path), repeat)
+    results = {"extract_pdf": throughput(len(pages), runs, "pages")}
+
+    csv_loader = CSVLoader()
+    csv_chunks, runs = timed(lambda: csv_loader.extract_csv(csv_path), repeat)
+    results["extract_csv"] = {**throughput(csv_loader.rows_read, runs, "rows"), "chunks": len(csv_chunks)}
+
+    chunker = TextChunker(chunk_size=400, overlap=80)
+    chunks, runs = timed(lambda: chunker.create_chunks(pages), repeat)
+    results["chunk"] = throughput(len(chunks), runs, "chunks")
+
+    texts = [c["text"] for c in chunks[:embed_sample]]
+    _, runs = timed(lambda: embedder.embed_texts(texts), repeat)
+    results["embed"] = throughput(len(texts), runs, "embeddings")
+
+    _, runs = timed(lambda: embedder.embed_query("what is the warranty policy"), repeat * 10)
+    results["embed_query"] = percentiles([r * 1000 for r in runs])
+    return results
+
+
+def bench_endpoints(pdf_path: str, csv_path: str, embedder, repeat: int, ask_count: int, seed: int) -> Dict:
+    # Imported late: main reads DATA_DIR / VECTOR_BACKEND / LLM env at import
+    import main
+    from fastapi.testclient import TestClient
+
+    # Startup builds the vector store around whichever embedder is benchmarked
+    main.EmbeddingGenerator = lambda: embedder
+
+    results = {}
+    with TestClient(main.app) as client:
+        # Startup returns at once and warms models in the background
+        main.warmup_done.wait()
+        if not main.warmup_state["ready"]:
+            raise RuntimeError(f"Warm-up failed: {main.warmup_state['error']}")
+        for key, path, mime in (("upload_pdf", pdf_path, "application/pdf"), ("upload_csv", csv_path, "text/csv")):
+            samples = []
+            for i in range(repeat + 1):
+                with open(path, "rb") as f:
+                    t0 = time.perf_counter()
+                    # reindex=false: every run is a fresh full ingest, not an incremental diff
+                    r = client.post(
+                        "/upload",
+                        files={"file": (os.path.basename(path), f, mime)},
+                        data={"currentUrl": f"bench-{key}", "reindex": "false"},
+                    )
+                    elapsed = (time.perf_counter() - t0) * 1000
+                r.raise_for_status()
+                if i:  # first run is warm-up
+                    samples.append(elapsed)
+            results[key] = percentiles(samples)
+
+        samples, errors = [], 0
+        for question in synthetic.questions(ask_count, seed=seed):
+            t0 = time.perf_counter()
+            r = client.post("/ask", json={"question": question, "currentUrl": "bench-upload_pdf"})
+            samples.append((time.perf_counter() - t0) * 1000)
+            errors += r.status_code != 200
+        results["ask"] = {**percentiles(samples), "errors": errors}
+        results["stage_breakdown"] = main.REGISTRY.stage_summary()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=30, help="Synthetic PDF pages")
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--rows", type=int, default=1000, help="Synthetic CSV rows")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per measurement (after one warm-up)")
+    parser.add_argument("--asks", type=int, default=50, help="Questions for the /ask latency run")
+    parser.add_argument("--embed-sample", type=int, default=256, help="Chunks embedded in the embed stage")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="model: configured EmbeddingGenerator; hash: deterministic stand-in")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Fake LLM response latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-endpoints", action="store_true", help="Only benchmark the individual stages")
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, workdir: str):
+    use_local_backends(os.path.join(workdir, "data"), llm_latency_ms=args.llm_latency_ms)
+
+    pdf_path = synthetic.make_pdf(os.path.join(workdir, "synthetic.pdf"), args.pages, args.words_per_page, args.seed)
+    csv_path = synthetic.make_csv(os.path.join(workdir, "synthetic.csv"), args.rows, args.seed)
+
+    if args.embedder == "hash":
+        embedder = HashEmbedder()
+    else:
+        from rag.embedder import EmbeddingGenerator
+        embedder = EmbeddingGenerator()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "params": vars(args),
+            "embedder": getattr(embedder, "mode", type(embedder).__name__),
+            "pdf_bytes": os.path.getsize(pdf_path),
+            "csv_bytes": os.path.getsize(csv_path),
+        },
+        "stages": bench_stages(pdf_path, csv_path, embedder, args.repeat, args.embed_sample),
+    }
+    if not args.skip_endpoints:
+        report["endpoints"] = bench_endpoints(pdf_path, csv_path, embedder, args.repeat, args.asks, args.seed)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
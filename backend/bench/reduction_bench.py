@@ -0,0 +1,134 @@
+"""
+Reduction Benchmark
+Recall / latency / memory of reduced-dimension local indexes, to pick EMBED_REDUCE_DIM
+
+Usage:
+    python -m bench.reduction_bench --embedder model --dims 64 128 192 256 --rescore 0 4
+    python -m bench.reduction_bench --embedder hash --pages 200 --out reduction.json
+
+Synthetic pages are chunked and embedded once; queries are synthetic
+questions. Every configuration (method x dim x rescore factor) is compared
+with an exact full-width search of the same vectors:
+    recall_at_k        share of the top-k that is in the full-width top-k
+                       (ids tied with the k-th full-width score count as hits)
+    latency_ms         single-query p50 / p95
+    batch_qps          query_many throughput
+    resident_bytes     index memory (incl. float16 full-width rows when kept)
+    explained_variance PCA only: share of the vectors' energy kept
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import numpy as np
+from typing import Dict, List
+
+from bench import synthetic
+from bench.fakes import HashEmbedder
+from rag.chunker import TextChunker
+from rag.local_index import LocalVectorIndex
+from rag.reduction import ReductionConfig
+
+
+def build(dimension: int, vectors: List[Dict], reduction: ReductionConfig = None):
+    index = LocalVectorIndex(dimension, reduction=reduction)
+    t0 = time.perf_counter()
+    index.upsert(vectors, namespace="bench")
+    return index, time.perf_counter() - t0
+
+
+def measure(index: LocalVectorIndex, queries: np.ndarray, truth: List[set], top_k: int) -> Dict:
+    latencies = []
+    recalls = []
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        matches = index.query(q, top_k=top_k, namespace="bench")["matches"]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len(expected & {m["id"] for m in matches}) / max(min(len(expected), top_k), 1))
+
+    t0 = time.perf_counter()
+    index.query_many(queries, top_k=top_k, namespace="bench")
+    batch_s = time.perf_counter() - t0
+
+    stats = index.describe_index_stats()
+    lat = np.asarray(latencies)
+    return {
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "latency_ms_p50": round(float(np.percentile(lat, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(lat, 95)), 3),
+        "batch_qps": round(len(queries) / batch_s, 1) if batch_s else None,
+        "resident_bytes": stats["resident_bytes"],
+        "dimension": stats["namespaces"]["bench"]["dimension"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300, help="Synthetic pages to chunk and embed")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 128, 192])
+    parser.add_argument("--methods", nargs="+", choices=["pca", "prefix"], default=["pca", "prefix"])
+    parser.add_argument("--rescore", type=int, nargs="+", default=[0, 4], help="EMBED_RESCORE_FACTOR values")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="model: configured EmbeddingGenerator; hash: deterministic stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    if args.embedder == "hash":
+        embedder = HashEmbedder()
+    else:
+        from rag.embedder import EmbeddingGenerator
+        embedder = EmbeddingGenerator()
+
+    rng = random.Random(args.seed)
+    pages = [{"page": i + 1, "text": " ".join(synthetic.page_lines(rng, i + 1, 350))} for i in range(args.pages)]
+    chunks = TextChunker(chunk_size=400, overlap=80).create_chunks(pages)
+    embeddings = embedder.embed_texts([c["text"] for c in chunks])
+    queries = embedder.embed_texts(synthetic.questions(args.queries, seed=args.seed))
+    vectors = [{"id": str(i), "values": v} for i, v in enumerate(embeddings)]
+    dimension = embeddings.shape[1]
+
+    full, build_s = build(dimension, vectors)
+    # Exact scores, so ties at the k-th place don't count as misses
+    normed = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    scores = (queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)) @ normed.T
+    kth = -np.partition(-scores, args.top_k - 1, axis=1)[:, args.top_k - 1]
+    truth = [{str(i) for i in np.flatnonzero(row >= cutoff - 1e-5)} for row, cutoff in zip(scores, kth)]
+    report = {
+        "meta": {
+            "embedder": getattr(embedder, "mode", type(embedder).__name__),
+            "vectors": len(vectors),
+            "full_dim": dimension,
+            "params": vars(args),
+        },
+        "full": {**measure(full, queries, truth, args.top_k), "build_s": round(build_s, 3)},
+        "reduced": [],
+    }
+
+    for method in args.methods:
+        for dim in args.dims:
+            if dim >= dimension:
+                continue
+            for rescore in args.rescore:
+                config = ReductionConfig(dim=dim, method=method, min_vectors=0, rescore=rescore)
+                index, build_s = build(dimension, vectors, config)
+                ns = index.namespaces["bench"]
+                row = {"method": method, "dim": dim, "rescore": rescore, "build_s": round(build_s, 3)}
+                if method == "pca":
+                    row["explained_variance"] = round(ns.projection.explained, 4)
+                report["reduced"].append({**row, **measure(index, queries, truth, args.top_k)})
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Rerank Benchmark
+Latency / quality trade-off of the cross-encoder rerank stage
+
+Usage:
+    python -m bench.rerank_bench --chunks data/chunks.json --eval eval.jsonl
+
+eval.jsonl holds one labelled question per line:
+    {"question": "...", "page": 12}          # relevant page, or
+    {"question": "...", "answer": "..."}     # substring expected in a relevant chunk
+
+Runs entirely offline: chunks are embedded once with EmbeddingGenerator and
+searched with an in-memory cosine index, so only retrieval + rerank is timed.
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+from rag.embedder import EmbeddingGenerator
+from rag.reranker import CrossEncoderReranker
+
+
+class InMemoryIndex:
+    """Minimal cosine index with the same search() contract as VectorStore"""
+
+    def __init__(self, embedder, chunks):
+        self.embedder = embedder
+        self.chunks = chunks
+        vectors = embedder.embed_texts([c["text"] for c in chunks])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.matrix = vectors / np.maximum(norms, 1e-12)
+
+    def search(self, query, top_k=3, tenant_id="default"):
+        q = self.embedder.embed_query(query)
+        q = q / max(np.linalg.norm(q), 1e-12)
+        sims = self.matrix @ q
+        k = min(top_k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        results = [
+            {"id": str(i), "text": self.chunks[i]["text"], "page": self.chunks[i].get("page", 0)}
+            for i in top
+        ]
+        return [float(sims[i]) for i in top], results
+
+
+def is_relevant(item, case):
+    if "page" in case:
+        return int(item.get("page", -1)) == int(case["page"])
+    return case["answer"].lower() in item.get("text", "").lower()
+
+
+def evaluate(index, cases, top_k, reranker=None, candidates=20):
+    latencies = []
+    hits = 0
+    reciprocal_ranks = []
+    for case in cases:
+        t0 = time.perf_counter()
+        if reranker is None:
+            _, results = index.search(case["question"], top_k)
+        else:
+            scores, results = index.search(case["question"], candidates)
+            _, results = reranker.rerank(case["question"], scores, results, top_k=top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+        rank = next((r for r, item in enumerate(results, 1) if is_relevant(item, case)), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+
+    lat = np.array(latencies)
+    return {
+        "hit_rate": hits / len(cases),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "latency_ms_p50": float(np.percentile(lat, 50)),
+        "latency_ms_p95": float(np.percentile(lat, 95)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", required=True, help="JSON list of chunk dicts (text, page)")
+    parser.add_argument("--eval", required=True, help="JSONL of labelled questions")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 20, 50])
+    args = parser.parse_args()
+
+    with open(args.chunks, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    with open(args.eval, "r", encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+
+    embedder = EmbeddingGenerator()
+    index = InMemoryIndex(embedder, chunks)
+
+    report = {"top_k": args.top_k, "questions": len(cases), "runs": []}
+    report["runs"].append({"mode": "vector", **evaluate(index, cases, args.top_k)})
+
+    reranker = CrossEncoderReranker()
+    for n in args.candidates:
+        # Cold pass fills the score cache, warm pass shows cached latency
+        cold = evaluate(index, cases, args.top_k, reranker, n)
+        warm = evaluate(index, cases, args.top_k, reranker, n)
+        report["runs"].append({"mode": f"rerank@{n}", **cold, "warm_latency_ms_p50": warm["latency_ms_p50"]})
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Routing Benchmark
+Recall / latency / rows scanned of two-stage (document-centroid) search, to pick SEARCH_DOC_CANDIDATES
+
+Usage:
+    python -m bench.routing_bench --embedder model --documents 100 --candidates 1 2 4 8
+    python -m bench.routing_bench --embedder hash --documents 400 --pages 5 --out routing.json
+
+Synthetic documents each lean towards one topic (its own slice of the
+vocabulary, with --mix of their sentences drawn from anywhere), like a
+tenant's collection of manuals, reports and policies. Documents are chunked,
+embedded and indexed once; queries are sentences written on a random
+document's topic. Every SEARCH_DOC_CANDIDATES value is compared with an
+exact search over all chunks of the same index:
+    recall_at_k        share of the top-k that is in the exact top-k
+                       (ids tied with the k-th exact score count as hits)
+    latency_ms         single-query p50 / p95
+    batch_qps          query_many throughput
+    rows_scanned       chunks scored per query (centroid scoring not included)
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import numpy as np
+from typing import Dict, List
+
+from bench import synthetic
+from bench.fakes import HashEmbedder
+from rag.chunker import TextChunker
+from rag.local_index import LocalVectorIndex
+from rag.metrics import REGISTRY
+
+
+def document_pages(rng: random.Random, vocab: List[str], pages: int, words_per_page: int, mix: float) -> List[Dict]:
+    """Pages of sentences on one topic, a `mix` share of them off-topic"""
+    result = []
+    for page_no in range(1, pages + 1):
+        sentences, count = [], 0
+        while count < words_per_page:
+            words = synthetic.WORDS if rng.random() < mix else vocab
+            sentence = [rng.choice(words) for _ in range(rng.randint(8, 20))]
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            count += len(sentence)
+        result.append({"page": page_no, "text": " ".join(sentences)})
+    return result
+
+
+def rows_scanned() -> float:
+    return sum(value for (name, _), value in REGISTRY._counters.items() if name == "rag_index_rows_scanned_total")
+
+
+def measure(index: LocalVectorIndex, queries: np.ndarray, truth: List[set], top_k: int, candidates: int) -> Dict:
+    latencies = []
+    recalls = []
+    scanned = rows_scanned()
+    for q, expected in zip(queries, truth):
+        t0 = time.perf_counter()
+        matches = index.query(q, top_k=top_k, namespace="bench", documents=candidates)["matches"]
+        latencies.append((time.perf_counter() - t0) * 1000)
+        recalls.append(len(expected & {m["id"] for m in matches}) / max(min(len(expected), top_k), 1))
+    scanned = rows_scanned() - scanned
+
+    t0 = time.perf_counter()
+    index.query_many(queries, top_k=top_k, namespace="bench", documents=candidates)
+    batch_s = time.perf_counter() - t0
+
+    lat = np.asarray(latencies)
+    return {
+        "candidates": candidates,
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "latency_ms_p50": round(float(np.percentile(lat, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(lat, 95)), 3),
+        "batch_qps": round(len(queries) / batch_s, 1) if batch_s else None,
+        "rows_scanned": round(scanned / len(queries), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=10, help="Pages per document")
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--topics", type=int, default=12)
+    parser.add_argument("--mix", type=float, default=0.3, help="Share of off-topic sentences per document")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--candidates", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="SEARCH_DOC_CANDIDATES values")
+    parser.add_argument("--embedder", choices=["model", "hash"], default="model",
+                        help="model: configured EmbeddingGenerator; hash: deterministic stand-in")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    if args.embedder == "hash":
+        embedder = HashEmbedder()
+    else:
+        from rag.embedder import EmbeddingGenerator
+        embedder = EmbeddingGenerator()
+
+    rng = random.Random(args.seed)
+    vocab = [synthetic.WORDS[t::args.topics] for t in range(args.topics)]
+    chunker = TextChunker(chunk_size=400, overlap=80)
+    texts, vectors_meta = [], []
+    for doc in range(args.documents):
+        pages = document_pages(rng, vocab[doc % args.topics], args.pages, args.words_per_page, args.mix)
+        for chunk in chunker.create_chunks(pages):
+            texts.append(chunk["text"])
+            vectors_meta.append({"document_id": f"doc-{doc}", "page": chunk["page"]})
+    embeddings = embedder.embed_texts(texts)
+    vectors = [{"id": str(i), "values": v, "metadata": m} for i, (v, m) in enumerate(zip(embeddings, vectors_meta))]
+    query_texts = [" ".join(rng.choice(vocab[rng.randrange(args.topics)]) for _ in range(12)) for _ in range(args.queries)]
+    queries = embedder.embed_texts(query_texts)
+
+    index = LocalVectorIndex(embeddings.shape[1])
+    t0 = time.perf_counter()
+    index.upsert(vectors, namespace="bench")
+    build_s = time.perf_counter() - t0
+
+    # Exact scores, so ties at the k-th place don't count as misses
+    normed = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    scores = (queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)) @ normed.T
+    kth = -np.partition(-scores, args.top_k - 1, axis=1)[:, args.top_k - 1]
+    truth = [{str(i) for i in np.flatnonzero(row >= cutoff - 1e-5)} for row, cutoff in zip(scores, kth)]
+    report = {
+        "meta": {
+            "embedder": getattr(embedder, "mode", type(embedder).__name__),
+            "vectors": len(vectors),
+            "documents": args.documents,
+            "build_s": round(build_s, 3),
+            "params": vars(args),
+        },
+        "full": measure(index, queries, truth, args.top_k, 0),
+        "routed": [measure(index, queries, truth, args.top_k, n) for n in args.candidates],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
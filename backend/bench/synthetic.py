@@ -0,0 +1,157 @@
+"""
+Synthetic Documents
+Deterministic PDFs and CSVs of configurable size for benchmarks
+
+Text is drawn from a fixed vocabulary with a seeded RNG, so the same
+arguments always produce byte-identical files (and identical chunk counts).
+"""
+
+import csv
+import random
+from typing import Dict, List, Tuple
+
+WORDS = (
+    "system data model index vector query latency throughput document page chunk token "
+    "embedding cluster tenant storage network request response cache memory disk policy "
+    "warranty battery voltage sensor display module firmware update install configure "
+    "support customer product price order shipping return invoice account security "
+    "performance capacity quality report analysis summary section overview detail"
+).split()
+
+CATEGORIES = ["Electronics", "Furniture", "Clothing", "Grocery", "Sports", "Toys"]
+
+
+def sentence(rng: random.Random, min_words: int = 8, max_words: int = 20) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return " ".join(words).capitalize() + "."
+
+
+def page_lines(rng: random.Random, page_no: int, words_per_page: int, line_width: int = 90) -> List[str]:
+    """A title-case heading followed by wrapped body text"""
+    heading = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+    lines = [f"Section {page_no} {heading}", ""]
+    current, count = "", 0
+    while count < words_per_page:
+        s = sentence(rng)
+        count += len(s.split())
+        for word in s.split():
+            if len(current) + len(word) + 1 > line_width:
+                lines.append(current)
+                current = word
+            else:
+                current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def topical_pages(pages: int, words_per_page: int = 350, topics: int = 6, seed: int = 0) -> Tuple[List[Dict], List[List[tuple]]]:
+    """
+    Pages of run-on paragraphs, each about one topic (its own slice of WORDS)
+
+    Paragraphs are joined with a plain space, so topic shifts are only
+    visible in the words. Returns (pages_text as the loaders produce it,
+    per-page [(char_start, char_end, topic)] paragraph labels).
+    """
+    rng = random.Random(seed)
+    vocab = [WORDS[t::topics] for t in range(topics)]
+    pages_text, labels = [], []
+    for page_no in range(1, pages + 1):
+        parts, spans, length, count = [], [], 0, 0
+        while count < words_per_page:
+            topic = rng.randrange(topics)
+            sentences = []
+            for _ in range(rng.randint(3, 7)):
+                words = [rng.choice(vocab[topic]) for _ in range(rng.randint(8, 20))]
+                sentences.append(" ".join(words).capitalize() + ".")
+                count += len(words)
+            paragraph = " ".join(sentences)
+            start = length + (1 if parts else 0)
+            parts.append(paragraph)
+            spans.append((start, start + len(paragraph), topic))
+            length = start + len(paragraph)
+        pages_text.append({"page": page_no, "text": " ".join(parts)})
+        labels.append(spans)
+    return pages_text, labels
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(path: str, pages: int = 10, words_per_page: int = 350, seed: int = 0) -> str:
+    """
+    Write a minimal text PDF (Helvetica, one content stream per page)
+
+    Hand-rolled so no PDF-writing dependency is needed; PyPDF2 extracts it
+    like any other text PDF.
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page_no in range(1, pages + 1):
+        lines = page_lines(rng, page_no, words_per_page)
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        ops += [f"({_pdf_escape(line)}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % pages
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+    with open(path, "wb") as f:
+        f.write(out)
+    return path
+
+
+def make_csv(path: str, rows: int = 1000, seed: int = 0) -> str:
+    """Product-catalog style CSV: id, name, category, price, stock, description"""
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Product_ID", "Name", "Category", "Price", "Stock", "Description"])
+        for i in range(rows):
+            writer.writerow([
+                f"P{i:06d}",
+                " ".join(rng.choice(WORDS) for _ in range(2)).title(),
+                rng.choice(CATEGORIES),
+                f"{rng.uniform(5, 2000):.2f}",
+                rng.randint(0, 500),
+                sentence(rng, 6, 14),
+            ])
+    return path
+
+
+def questions(count: int, seed: int = 0) -> List[str]:
+    """Mixed retrieval / tabular questions"""
+    rng = random.Random(seed)
+    templates = [
+        lambda: f"What does the document say about {rng.choice(WORDS)} {rng.choice(WORDS)}?",
+        lambda: f"Explain the {rng.choice(WORDS)} section",
+        lambda: f"How is {rng.choice(WORDS)} related to {rng.choice(WORDS)}?",
+        lambda: f"How many products are in {rng.choice(CATEGORIES)}?",
+        lambda: f"What is the average price of {rng.choice(CATEGORIES)} products?",
+    ]
+    return [rng.choice(templates)() for _ in range(count)]
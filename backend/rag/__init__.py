@@ -1,19 +1,30 @@
 """
 RAG Package
 Modular components for Retrieval-Augmented Generation
+
+Exports are resolved lazily (PEP 562), so `import rag.loader` doesn't pull
+in every submodule and its dependencies.
 """
 
-from .loader import PDFLoader, CSVLoader
-from .chunker import TextChunker
-from .embedder import EmbeddingGenerator
-from .vector_store import VectorStore
-from .qa import QuestionAnswerer
+import importlib
+
+_EXPORTS = {
+    'PDFLoader': '.loader',
+    'CSVLoader': '.loader',
+    'TextChunker': '.chunker',
+    'EmbeddingGenerator': '.embedder',
+    'VectorStore': '.vector_store',
+    'QuestionAnswerer': '.qa',
+    'CrossEncoderReranker': '.reranker',
+}
+
+__all__ = list(_EXPORTS)
+
 
-__all__ = [
-    'PDFLoader',
-    'CSVLoader',
-    'TextChunker',
-    'EmbeddingGenerator',
-    'VectorStore',
-    'QuestionAnswerer'
-]
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,374 @@
+"""
+Document Catalog Module
+Embedded transactional document registry (SQLite, WAL mode)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .logger import get_logger
+
+logger = get_logger("catalog")
+
+
+class DocumentCatalog:
+    """
+    Indexed, multi-worker-safe replacement for registry.json
+
+    Interview Note: Rewriting a JSON list on every change is O(n) per upload
+    and loses updates when several workers write at once. SQLite in WAL mode
+    gives atomic single-row inserts/deletes, concurrent readers, and indexed
+    lookups by id, tenant and upload date.
+    """
+
+    SORTABLE = {"upload_date", "name", "file_size", "chunk_count"}
+
+    def __init__(self, db_path: str, legacy_json_path: Optional[str] = None):
+        """
+        Open (or create) the catalog
+
+        Args:
+            db_path: SQLite database file
+            legacy_json_path: registry.json to import once, if present
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._init_schema()
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections aren't thread-safe)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                tenant_id TEXT NOT NULL DEFAULT 'default',
+                name TEXT NOT NULL,
+                original_filename TEXT,
+                upload_date TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL DEFAULT 0,
+                page_count INTEGER NOT NULL DEFAULT 0,
+                file_size INTEGER NOT NULL DEFAULT 0,
+                embedding_backend TEXT,
+                status TEXT NOT NULL DEFAULT 'indexed',
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_documents_tenant_date ON documents (tenant_id, upload_date);
+            CREATE INDEX IF NOT EXISTS idx_documents_upload_date ON documents (upload_date);
+            CREATE INDEX IF NOT EXISTS idx_documents_tenant_name ON documents (tenant_id, name);
+
+            -- Vector ids indexed for each document (stable content-hash ids)
+            CREATE TABLE IF NOT EXISTS document_vectors (
+                doc_id TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                page INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (doc_id, vector_id)
+            ) WITHOUT ROWID;
+
+            -- Ingest-time summaries: status pending | ready | failed; sections / suggestions are JSON
+            CREATE TABLE IF NOT EXISTS document_summaries (
+                doc_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                source_hash TEXT,
+                summary TEXT,
+                sections TEXT,
+                suggestions TEXT,
+                method TEXT,
+                updated_at TEXT
+            ) WITHOUT ROWID;
+        """)
+
+    def _migrate_json(self, json_path: str):
+        """Import a legacy registry.json once, then rename it"""
+        if not os.path.exists(json_path):
+            return
+        try:
+            with open(json_path, "r") as f:
+                entries = json.load(f)
+        except Exception as e:
+            logger.warning("Could not read legacy registry", extra={"path": json_path, "error": str(e)})
+            return
+
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for entry in entries:
+                self._insert(conn, entry, entry.get("tenant_id", "default"), replace=False)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        os.replace(json_path, json_path + ".migrated")
+        logger.info("Migrated legacy registry into catalog", extra={"documents": len(entries), "path": json_path})
+
+    # -------------------------------
+    # WRITES (single-row, O(log n))
+    # -------------------------------
+    def add(self, entry: Dict, tenant_id: str = "default"):
+        """Insert a document entry (registry.json-style dict)"""
+        self._insert(self._conn(), entry, tenant_id, replace=True)
+
+    def _insert(self, conn: sqlite3.Connection, entry: Dict, tenant_id: str, replace: bool):
+        known = {
+            "id", "document_id", "tenant_id", "name", "original_filename", "upload_date", "upload_timestamp",
+            "chunk_count", "total_chunks", "page_count", "total_pages", "file_size", "embedding_backend", "status",
+        }
+        extra = {k: v for k, v in entry.items() if k not in known}
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        conn.execute(
+            f"""{verb} INTO documents
+                (id, tenant_id, name, original_filename, upload_date, chunk_count, page_count,
+                 file_size, embedding_backend, status, extra)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                entry["id"],
+                tenant_id,
+                entry.get("name", ""),
+                entry.get("original_filename", entry.get("name")),
+                entry.get("upload_date") or entry.get("upload_timestamp"),
+                int(entry.get("chunk_count", entry.get("total_chunks", 0)) or 0),
+                int(entry.get("page_count", entry.get("total_pages", 0)) or 0),
+                int(entry.get("file_size", 0) or 0),
+                entry.get("embedding_backend"),
+                entry.get("status", "indexed"),
+                json.dumps(extra) if extra else None,
+            ),
+        )
+
+    def update(self, doc_id: str, **fields) -> bool:
+        """Update columns (or extra keys) of one document"""
+        doc = self.get(doc_id)
+        if doc is None:
+            return False
+        doc.update(fields)
+        if "chunk_count" in fields:
+            doc["total_chunks"] = fields["chunk_count"]
+        if "page_count" in fields:
+            doc["total_pages"] = fields["page_count"]
+        self._insert(self._conn(), doc, doc["tenant_id"], replace=True)
+        return True
+
+    def delete(self, doc_id: str) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
+            conn.execute("DELETE FROM document_vectors WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM document_summaries WHERE doc_id = ?", (doc_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount > 0
+
+    def clear(self, tenant_id: Optional[str] = None):
+        conn = self._conn()
+        if tenant_id is None:
+            conn.execute("DELETE FROM documents")
+            conn.execute("DELETE FROM document_vectors")
+            conn.execute("DELETE FROM document_summaries")
+        else:
+            for table in ("document_vectors", "document_summaries"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE doc_id IN (SELECT id FROM documents WHERE tenant_id = ?)",
+                    (tenant_id,),
+                )
+            conn.execute("DELETE FROM documents WHERE tenant_id = ?", (tenant_id,))
+
+    def vector_ids(self, doc_id: str) -> Dict[str, int]:
+        """Tracked vector ids of a document -> page"""
+        rows = self._conn().execute(
+            "SELECT vector_id, page FROM document_vectors WHERE doc_id = ?", (doc_id,)
+        ).fetchall()
+        return {r["vector_id"]: r["page"] for r in rows}
+
+    def set_vector_ids(self, doc_id: str, added: Dict[str, int], removed: List[str], repaged: Dict[str, int] = None):
+        """Apply a vector-id diff for a document in one transaction"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "DELETE FROM document_vectors WHERE doc_id = ? AND vector_id = ?",
+                [(doc_id, vid) for vid in removed],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO document_vectors (doc_id, vector_id, page) VALUES (?, ?, ?)",
+                [(doc_id, vid, page) for vid, page in {**added, **(repaged or {})}.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def set_summary(self, doc_id: str, status: str, source_hash: Optional[str] = None, summary: Optional[str] = None,
+                    sections: Optional[List[Dict]] = None, suggestions: Optional[List[str]] = None, method: Optional[str] = None):
+        """Store (replace) a document's summary record"""
+        self._conn().execute(
+            """INSERT OR REPLACE INTO document_summaries
+                (doc_id, status, source_hash, summary, sections, suggestions, method, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))""",
+            (
+                doc_id, status, source_hash, summary,
+                json.dumps(sections) if sections is not None else None,
+                json.dumps(suggestions) if suggestions is not None else None,
+                method,
+            ),
+        )
+
+    def finish_summary(self, doc_id: str, source_hash: str, status: str, summary: Optional[str] = None,
+                       sections: Optional[List[Dict]] = None, suggestions: Optional[List[str]] = None,
+                       method: Optional[str] = None) -> bool:
+        """
+        Store a summary job's result only if the record still belongs to the
+        same source text (one conditional UPDATE, so a re-upload that set a new
+        pending hash meanwhile can't be overwritten); False if it was stale
+        """
+        cursor = self._conn().execute(
+            """UPDATE document_summaries
+                SET status = ?, summary = ?, sections = ?, suggestions = ?, method = ?,
+                    updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                WHERE doc_id = ? AND source_hash = ?""",
+            (
+                status, summary,
+                json.dumps(sections) if sections is not None else None,
+                json.dumps(suggestions) if suggestions is not None else None,
+                method, doc_id, source_hash,
+            ),
+        )
+        return cursor.rowcount > 0
+
+    # -------------------------------
+    # READS
+    # -------------------------------
+    def summary(self, doc_id: str) -> Optional[Dict]:
+        """A document's summary record (status, summary, sections, suggestions), or None"""
+        row = self._conn().execute("SELECT * FROM document_summaries WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "doc_id": row["doc_id"],
+            "status": row["status"],
+            "source_hash": row["source_hash"],
+            "summary": row["summary"],
+            "sections": json.loads(row["sections"]) if row["sections"] else [],
+            "suggestions": json.loads(row["suggestions"]) if row["suggestions"] else [],
+            "method": row["method"],
+            "updated_at": row["updated_at"],
+        }
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        row = self._conn().execute("SELECT * FROM documents WHERE id = ?", (doc_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def find_by_name(self, tenant_id: str, name: str) -> Optional[Dict]:
+        """Most recent document with this name in the tenant"""
+        row = self._conn().execute(
+            "SELECT * FROM documents WHERE tenant_id = ? AND name = ? ORDER BY upload_date DESC LIMIT 1",
+            (tenant_id, name),
+        ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def latest(self, tenant_id: Optional[str] = None) -> Optional[Dict]:
+        if tenant_id is None:
+            row = self._conn().execute("SELECT * FROM documents ORDER BY upload_date DESC LIMIT 1").fetchone()
+        else:
+            row = self._conn().execute(
+                "SELECT * FROM documents WHERE tenant_id = ? ORDER BY upload_date DESC LIMIT 1", (tenant_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list(
+        self,
+        tenant_id: Optional[str] = None,
+        status: Optional[str] = None,
+        name_contains: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        sort: str = "upload_date",
+        order: str = "asc",
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[List[Dict], int]:
+        """
+        Filtered, paginated listing
+
+        Returns:
+            (documents, total matching count)
+        """
+        clauses, params = [], []
+        if tenant_id is not None:
+            clauses.append("tenant_id = ?")
+            params.append(tenant_id)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if name_contains:
+            clauses.append("name LIKE ? ESCAPE '\\'")
+            escaped = name_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if since:
+            clauses.append("upload_date >= ?")
+            params.append(since)
+        if until:
+            clauses.append("upload_date <= ?")
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sort_col = sort if sort in self.SORTABLE else "upload_date"
+        direction = "DESC" if order.lower() == "desc" else "ASC"
+
+        conn = self._conn()
+        total = conn.execute(f"SELECT COUNT(*) FROM documents {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT * FROM documents {where} ORDER BY {sort_col} {direction}, id LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [self._to_dict(r) for r in rows], total
+
+    def tenants(self) -> List[str]:
+        rows = self._conn().execute("SELECT DISTINCT tenant_id FROM documents").fetchall()
+        return [r[0] for r in rows]
+
+    def count(self, tenant_id: Optional[str] = None) -> int:
+        if tenant_id is None:
+            return self._conn().execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return self._conn().execute("SELECT COUNT(*) FROM documents WHERE tenant_id = ?", (tenant_id,)).fetchone()[0]
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict:
+        """Row -> the registry.json entry shape the frontend already consumes"""
+        doc = {
+            "id": row["id"],
+            "document_id": row["id"],
+            "tenant_id": row["tenant_id"],
+            "name": row["name"],
+            "original_filename": row["original_filename"],
+            "upload_date": row["upload_date"],
+            "upload_timestamp": row["upload_date"],
+            "chunk_count": row["chunk_count"],
+            "total_chunks": row["chunk_count"],
+            "page_count": row["page_count"],
+            "total_pages": row["page_count"],
+            "file_size": row["file_size"],
+            "embedding_backend": row["embedding_backend"],
+            "status": row["status"],
+        }
+        if row["extra"]:
+            doc.update(json.loads(row["extra"]))
+        return doc
@@ -0,0 +1,193 @@
+"""
+Chunk Store Module
+Per-document binary chunk storage: UTF-8 text blob + fixed-width index, memory-mapped
+"""
+
+import mmap
+import os
+import re
+import threading
+import numpy as np
+from typing import Dict, Iterator, List, Optional
+
+from .chunker import ChunkTable
+
+
+# One fixed-width record per chunk; text_offset/text_len are byte offsets into the blob
+CHUNK_RECORD = np.dtype([
+    ("chunk_id", "<i8"),
+    ("page", "<i4"),
+    ("char_start", "<i4"),
+    ("char_end", "<i4"),
+    ("text_len", "<i4"),
+    ("text_offset", "<i8"),
+])
+
+
+class DocumentChunks:
+    """
+    Read-only, list-like view over one document's stored chunks
+
+    Supports len(), iteration, view[i] (i-th chunk) and get(chunk_id), each
+    returning the same dict shape TextChunker produces. Only the requested
+    chunk's bytes are touched.
+    """
+
+    def __init__(self, records: np.ndarray, blob):
+        self.records = records
+        self.blob = blob
+        # Chunk ids are assigned sequentially by TextChunker, so row = id - first id
+        self._contiguous = len(records) == 0 or (
+            int(records["chunk_id"][-1]) - int(records["chunk_id"][0]) == len(records) - 1
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, row: int) -> Dict:
+        if row < 0:
+            row += len(self.records)
+        if not 0 <= row < len(self.records):
+            raise IndexError(row)
+        return self._materialize(self.records[row])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self.records)):
+            yield self._materialize(self.records[row])
+
+    def get(self, chunk_id: int) -> Optional[Dict]:
+        """Random access by chunk id"""
+        ids = self.records["chunk_id"]
+        if len(ids) == 0:
+            return None
+        if self._contiguous:
+            row = chunk_id - int(ids[0])
+        else:
+            row = int(np.searchsorted(ids, chunk_id))
+        if 0 <= row < len(ids) and int(ids[row]) == chunk_id:
+            return self._materialize(self.records[row])
+        return None
+
+    def _materialize(self, rec) -> Dict:
+        start = int(rec["text_offset"])
+        text = bytes(self.blob[start:start + int(rec["text_len"])]).decode("utf-8")
+        return {
+            "chunk_id": int(rec["chunk_id"]),
+            "text": text,
+            "page": int(rec["page"]),
+            "char_start": int(rec["char_start"]),
+            "char_end": int(rec["char_end"]),
+            "chunk_size": len(text),
+        }
+
+
+class ChunkStore:
+    """
+    Stores each document's chunks as <doc>.bin (concatenated UTF-8 text) and
+    <doc>.idx (CHUNK_RECORD array), both memory-mapped for reads
+
+    Interview Note: A single pretty-printed chunks.json has to be parsed in
+    full to read one chunk and is overwritten by every upload. Fixed-width
+    records make lookup a pointer offset, so it costs the same regardless of
+    how many documents or chunks exist.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+        self._views: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _paths(self, doc_id: str):
+        safe = re.sub(r"[^A-Za-z0-9_\-]", "_", doc_id)
+        base = os.path.join(self.root_dir, safe)
+        return base + ".bin", base + ".idx"
+
+    def append(self, doc_id: str, chunks: List[Dict]) -> int:
+        """
+        Append chunks to a document (creating it if needed).
+        Chunk ids must keep increasing across appends to the same document.
+
+        Returns:
+            Number of chunks now stored for the document
+        """
+        blob_path, idx_path = self._paths(doc_id)
+        records = np.zeros(len(chunks), dtype=CHUNK_RECORD)
+
+        with self._lock:
+            offset = os.path.getsize(blob_path) if os.path.exists(blob_path) else 0
+            if isinstance(chunks, ChunkTable):
+                # Columns copy straight across; only the texts are materialised
+                encoded = [chunks.text(i).encode("utf-8") for i in range(len(chunks))]
+                for name in ("chunk_id", "page", "char_start", "char_end"):
+                    records[name] = chunks.columns[name]
+                records["text_len"] = [len(data) for data in encoded]
+                records["text_offset"] = offset + np.cumsum(records["text_len"], dtype=np.int64) - records["text_len"]
+            else:
+                encoded = []
+                for i, chunk in enumerate(chunks):
+                    data = chunk["text"].encode("utf-8")
+                    records[i] = (
+                        int(chunk.get("chunk_id", i)),
+                        int(chunk.get("page", 0)),
+                        int(chunk.get("char_start", 0)),
+                        int(chunk.get("char_end", len(chunk["text"]))),
+                        len(data),
+                        offset,
+                    )
+                    encoded.append(data)
+                    offset += len(data)
+
+            # Blob first: a crash between the writes leaves unreferenced bytes, never dangling records
+            with open(blob_path, "ab") as f:
+                f.write(b"".join(encoded))
+            with open(idx_path, "ab") as f:
+                f.write(records.tobytes())
+
+            self._views.pop(doc_id, None)
+            return os.path.getsize(idx_path) // CHUNK_RECORD.itemsize
+
+    def document(self, doc_id: str) -> Optional[DocumentChunks]:
+        """Memory-mapped view of a document's chunks, or None if unknown"""
+        blob_path, idx_path = self._paths(doc_id)
+        if not os.path.exists(idx_path):
+            return None
+
+        idx_size = os.path.getsize(idx_path)
+        with self._lock:
+            cached = self._views.get(doc_id)
+            if cached is not None and cached[0] == idx_size:
+                return cached[1]
+
+            n = idx_size // CHUNK_RECORD.itemsize
+            if n == 0:
+                view = DocumentChunks(np.zeros(0, dtype=CHUNK_RECORD), b"")
+            else:
+                records = np.memmap(idx_path, dtype=CHUNK_RECORD, mode="r", shape=(n,))
+                with open(blob_path, "rb") as f:
+                    blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.path.getsize(blob_path) else b""
+                view = DocumentChunks(records, blob)
+            self._views[doc_id] = (idx_size, view)
+            return view
+
+    def get(self, doc_id: str, chunk_id: int) -> Optional[Dict]:
+        view = self.document(doc_id)
+        return view.get(chunk_id) if view is not None else None
+
+    def delete(self, doc_id: str) -> bool:
+        blob_path, idx_path = self._paths(doc_id)
+        with self._lock:
+            self._views.pop(doc_id, None)
+            removed = False
+            for path in (blob_path, idx_path):
+                if os.path.exists(path):
+                    os.remove(path)
+                    removed = True
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+            for name in os.listdir(self.root_dir):
+                if name.endswith((".bin", ".idx")):
+                    os.remove(os.path.join(self.root_dir, name))
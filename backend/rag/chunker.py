@@ -1,9 +1,86 @@
 """
 Text Chunker Module
-Splits text into overlapping chunks for better retrieval
+Splits text into overlapping chunks for better retrieval, or into
+topic-coherent chunks at sentence-similarity drops (SemanticChunker)
 """
 
-from typing import List, Dict
+import re
+import numpy as np
+from typing import Dict, Iterator, List, Tuple, Union
+
+from .logger import get_logger
+from .metrics import span
+from .scheduler import EMBED_SCHEDULER
+
+logger = get_logger("chunker")
+
+
+class ChunkTable:
+    """
+    Compact, list-like chunk collection backed by the page texts themselves
+
+    Each chunk is a row in parallel int arrays (page text row, page number,
+    chunk id, raw char_start/char_end and the stripped text bounds); its text
+    is sliced out of the page string only when a chunk is accessed.
+
+    Supports len(), iteration, table[i] (the same dict shape TextChunker has
+    always produced) and table[a:b] (a sub-table sharing the page texts).
+
+    Interview Note: With heavy overlap, per-chunk dicts hold most of the
+    document two or three times over, plus seven Python objects per chunk.
+    Here the text exists once and a chunk costs a few array slots.
+    """
+
+    FIELDS = ("text_row", "page", "chunk_id", "char_start", "char_end", "text_start", "text_end")
+
+    def __init__(self, texts: List[str], columns: Dict[str, np.ndarray]):
+        self.texts = texts
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["chunk_id"])
+
+    def __getitem__(self, row: Union[int, slice]):
+        if isinstance(row, slice):
+            return ChunkTable(self.texts, {name: col[row] for name, col in self.columns.items()})
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return self._materialize(row)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for row in range(len(self)):
+            yield self._materialize(row)
+
+    def pages(self) -> List[Dict]:
+        """The page texts the chunks were cut from: [{"page", "text"}] in order"""
+        text_rows, first = np.unique(self.columns["text_row"], return_index=True)
+        return [{"page": int(self.columns["page"][i]), "text": self.texts[r]} for r, i in zip(text_rows, first)]
+
+    def text(self, row: int) -> str:
+        c = self.columns
+        return self.texts[c["text_row"][row]][c["text_start"][row]:c["text_end"][row]]
+
+    def _materialize(self, row: int) -> Dict:
+        c = self.columns
+        text = self.text(row)
+        return {
+            "chunk_id": int(c["chunk_id"][row]),
+            "text": text,
+            "page": int(c["page"][row]),
+            "char_start": int(c["char_start"][row]),
+            "char_end": int(c["char_end"][row]),
+            "chunk_size": len(text),
+        }
+
+    # JSON-friendly form (extraction cache); the page texts are stored once, not per chunk
+    def to_state(self) -> Dict:
+        return {"texts": self.texts, **{name: self.columns[name].tolist() for name in self.FIELDS}}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "ChunkTable":
+        return cls(state["texts"], {name: np.asarray(state[name], dtype=np.int64) for name in cls.FIELDS})
 
 
 class TextChunker:
@@ -28,7 +105,7 @@ class TextChunker:
         if overlap >= chunk_size:
             raise ValueError("Overlap must be less than chunk_size")
     
-    def create_chunks(self, pages_text: List[Dict[str, any]]) -> List[Dict[str, any]]:
+    def create_chunks(self, pages_text: List[Dict[str, any]]) -> ChunkTable:
         """
         Create overlapping chunks from pages
         
@@ -36,7 +113,7 @@ class TextChunker:
             pages_text: List of page dictionaries with 'page' and 'text'
             
         Returns:
-            List of chunk dictionaries with text, page, and chunk_id
+            ChunkTable; each item is a chunk dictionary with text, page, and chunk_id
             
         Example Output:
             [
@@ -50,29 +127,43 @@ class TextChunker:
                 ...
             ]
         """
-        all_chunks = []
-        chunk_id = 0
+        texts = []
+        rows = []
         
-        for page_data in pages_text:
-            page_num = page_data["page"]
-            page_text = page_data["text"]
-            
-            # Split page into chunks with overlap
-            page_chunks = self._chunk_text(page_text, page_num, chunk_id)
-            all_chunks.extend(page_chunks)
-            chunk_id += len(page_chunks)
+        with span("chunk", pages=len(pages_text)) as stage:
+            for page_data in pages_text:
+                page_num = page_data["page"]
+                page_text = page_data["text"]
+                
+                # Split page into chunks with overlap (bounds only, no text copies)
+                spans = self._chunk_spans(page_text)
+                if not spans:
+                    continue
+                text_row = len(texts)
+                texts.append(page_text)
+                rows.extend((text_row, page_num) + bounds for bounds in spans)
+            stage["chunks"] = len(rows)
         
-        print(f"✂️ Created {len(all_chunks)} chunks from {len(pages_text)} pages")
-        return all_chunks
+        # FIELDS order minus chunk_id, which is just the running row number
+        matrix = np.array(rows, dtype=np.int64).reshape(-1, 6)
+        columns = {name: np.ascontiguousarray(matrix[:, j]) for j, name in enumerate(
+            ("text_row", "page", "char_start", "char_end", "text_start", "text_end"))}
+        columns["chunk_id"] = np.arange(len(rows), dtype=np.int64)
+        table = ChunkTable(texts, columns)
+        logger.info("Created chunks", extra={"chunks": len(table), "pages": len(pages_text)})
+        return table
     
-    def _chunk_text(self, text: str, page_num: int, start_chunk_id: int) -> List[Dict[str, any]]:
+    def _chunk_spans(self, text: str) -> List[tuple]:
         """
         Chunk text respecting word boundaries
+
+        Returns:
+            (char_start, char_end, text_start, text_end) per non-empty chunk,
+            where text[text_start:text_end] == text[char_start:char_end].strip()
         """
-        chunks = []
+        spans = []
         text_len = len(text)
         start = 0
-        chunk_id = start_chunk_id
         
         while start < text_len:
             end = min(start + self.chunk_size, text_len)
@@ -85,18 +176,15 @@ class TextChunker:
                 if last_space != -1:
                     end = last_space
             
-            chunk_text = text[start:end].strip()
+            # Stripped bounds, same as text[start:end].strip() without building the string
+            text_start, text_end = start, end
+            while text_start < text_end and text[text_start].isspace():
+                text_start += 1
+            while text_end > text_start and text[text_end - 1].isspace():
+                text_end -= 1
             
-            if chunk_text:
-                chunks.append({
-                    "chunk_id": chunk_id,
-                    "text": chunk_text,
-                    "page": page_num,
-                    "char_start": start,
-                    "char_end": end,
-                    "chunk_size": len(chunk_text)
-                })
-                chunk_id += 1
+            if text_end > text_start:
+                spans.append((start, end, text_start, text_end))
             
             if end == text_len:
                 break
@@ -118,4 +206,172 @@ class TextChunker:
             if start >= end:
                 start = end # No overlap possible if word is huge, just continue
         
-        return chunks
+        return spans
+
+
+# Sentence ends: terminal punctuation (plus closing quotes / brackets) then whitespace, or a blank line
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s+|\n\s*\n")
+
+
+class SemanticChunker:
+    """
+    Splits pages at topic shifts instead of fixed character counts
+
+    Pages are split into sentences, every sentence is embedded once, and a
+    chunk ends where the similarity between adjacent sentences falls below
+    the document's `breakpoint_percentile`-th percentile (once the chunk
+    has min_chars), or when the next sentence would pass max_chars. Chunks
+    never span pages and don't overlap.
+
+    Chunk vectors are pooled from the sentence vectors (length-weighted
+    mean, normalised). A chunk whose sentences point in different
+    directions, i.e. pooled norm below `reencode_below`, is re-encoded as a
+    whole instead; all such chunks go in one embedding call.
+
+    Interview Note: Boundary detection needs sentence embeddings anyway;
+    pooling them means the chunks need no second full embedding pass,
+    only the (optional) re-encode of incoherent chunks.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        max_chars: int = 800,
+        min_chars: int = 200,
+        breakpoint_percentile: float = 20.0,
+        reencode_below: float = 0.0,
+        batch_size: int = 512,
+    ):
+        if min_chars >= max_chars:
+            raise ValueError("min_chars must be less than max_chars")
+        self.embedder = embedder
+        self.max_chars = max_chars
+        self.min_chars = min_chars
+        self.breakpoint_percentile = breakpoint_percentile
+        self.reencode_below = reencode_below
+        self.batch_size = batch_size
+        # Over-long sentences are cut at word boundaries into max_chars pieces
+        self._splitter = TextChunker(chunk_size=max_chars, overlap=0)
+        self.stats = {}
+
+    def create_chunks(self, pages_text: List[Dict[str, any]]) -> Tuple[ChunkTable, np.ndarray]:
+        """
+        Chunk pages and derive one vector per chunk
+
+        Returns:
+            (ChunkTable with the same rows as TextChunker's, float32 matrix
+            of L2-normalised chunk vectors aligned with it)
+        """
+        texts, pages, units = [], [], []
+        for page_data in pages_text:
+            spans = self._sentence_spans(page_data["text"])
+            if not spans:
+                continue
+            units.extend((len(texts), start, end) for start, end in spans)
+            texts.append(page_data["text"])
+            pages.append(page_data["page"])
+
+        with span("chunk", pages=len(pages_text), mode="semantic") as stage:
+            if not units:
+                stage["chunks"] = 0
+                return ChunkTable([], {name: np.zeros(0, dtype=np.int64) for name in ChunkTable.FIELDS}), \
+                    np.zeros((0, self.embedder.embedding_dim), dtype=np.float32)
+
+            sentence_vectors = self._normalize(self._embed([texts[t][s:e] for t, s, e in units]))
+            groups = self._group(units, sentence_vectors)
+
+            rows = []
+            for first, last in groups:
+                text_row, start, _ = units[first]
+                end = units[last][2]
+                rows.append((text_row, pages[text_row], start, end, start, end))
+            matrix = np.array(rows, dtype=np.int64).reshape(-1, 6)
+            columns = {name: np.ascontiguousarray(matrix[:, j]) for j, name in enumerate(
+                ("text_row", "page", "char_start", "char_end", "text_start", "text_end"))}
+            columns["chunk_id"] = np.arange(len(rows), dtype=np.int64)
+            table = ChunkTable(texts, columns)
+
+            vectors, reencoded = self._chunk_vectors(table, groups, units, sentence_vectors)
+            stage["chunks"] = len(table)
+
+        self.stats = {"sentences": len(units), "chunks": len(table), "reencoded": reencoded}
+        logger.info("Created semantic chunks", extra={**self.stats, "pages": len(pages_text)})
+        return table, vectors
+
+    # -------------------------------
+    # SENTENCES AND BOUNDARIES
+    # -------------------------------
+    def _sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        """Stripped (start, end) of each sentence; sentences over max_chars are cut into pieces"""
+        spans = []
+        start = 0
+        for match in _SENTENCE_END.finditer(text):
+            spans.extend(self._pieces(text, start, match.end()))
+            start = match.end()
+        spans.extend(self._pieces(text, start, len(text)))
+        return spans
+
+    def _pieces(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end <= start:
+            return []
+        if end - start <= self.max_chars:
+            return [(start, end)]
+        return [(start + s, start + e) for _, _, s, e in self._splitter._chunk_spans(text[start:end])]
+
+    def _group(self, units: List[Tuple[int, int, int]], vectors: np.ndarray) -> List[Tuple[int, int]]:
+        """(first, last) sentence index of each chunk"""
+        # Similarity of each sentence with the next; page breaks are always boundaries
+        similarity = np.einsum("ij,ij->i", vectors[:-1], vectors[1:])
+        same_page = np.array([units[i][0] == units[i + 1][0] for i in range(len(units) - 1)], dtype=bool)
+        threshold = float(np.percentile(similarity[same_page], self.breakpoint_percentile)) if same_page.any() else 0.0
+
+        groups = []
+        first = 0
+        for i in range(1, len(units)):
+            text_row, start, end = units[i]
+            length = end - units[first][1]
+            if not same_page[i - 1]:
+                split = True
+            elif length > self.max_chars:
+                split = True
+            else:
+                split = similarity[i - 1] < threshold and units[i - 1][2] - units[first][1] >= self.min_chars
+            if split:
+                groups.append((first, i - 1))
+                first = i
+        groups.append((first, len(units) - 1))
+        return groups
+
+    # -------------------------------
+    # VECTORS
+    # -------------------------------
+    def _chunk_vectors(self, table: ChunkTable, groups: List[Tuple[int, int]], units, sentence_vectors: np.ndarray):
+        lengths = np.array([end - start for _, start, end in units], dtype=np.float32)
+        pooled = np.zeros((len(groups), sentence_vectors.shape[1]), dtype=np.float32)
+        for row, (first, last) in enumerate(groups):
+            weights = lengths[first:last + 1]
+            pooled[row] = weights @ sentence_vectors[first:last + 1] / weights.sum()
+
+        # Norm of a mean of unit vectors: 1 when the sentences agree, lower as they diverge
+        coherence = np.linalg.norm(pooled, axis=1)
+        redo = np.flatnonzero(coherence < self.reencode_below) if self.reencode_below > 0 else np.zeros(0, dtype=np.int64)
+        pooled = self._normalize(pooled)
+        if len(redo):
+            pooled[redo] = self._normalize(self._embed([table.text(int(row)) for row in redo]))
+        return pooled, len(redo)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        parts = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            with EMBED_SCHEDULER.slot(cost=len(batch)):
+                parts.append(np.asarray(self.embedder.embed_texts(batch), dtype=np.float32))
+        return np.concatenate(parts)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
@@ -0,0 +1,53 @@
+"""
+Request Coalescing Module
+Single-flight execution: concurrent identical requests share one computation
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one in-flight call
+
+    Interview Note: Unlike a cache, nothing outlives the computation. The first
+    caller (leader) starts it as a task of its own; callers arriving while it
+    is in flight (followers) await the same task and receive the same result
+    or exception. Every caller awaits it through a shield, so a caller that
+    goes away (client disconnect), leader included, doesn't cancel the work
+    the others are waiting for.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "errors": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() once per key among concurrent callers
+
+        Args:
+            key: Identity of the request (must be hashable)
+            fn: Zero-arg coroutine factory producing the result
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            self.stats["leaders"] += 1
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Reading the exception also keeps one nobody awaited from being logged as unhandled
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        """Counters for status endpoints"""
+        return {**self.stats, "in_flight": len(self._in_flight)}
@@ -6,10 +6,14 @@ Creates vector embeddings using sentence transformers
 import os
 # from sentence_transformers import SentenceTransformer # Lazy import
 import numpy as np
-import requests
 import time
 from typing import List
 
+from .logger import get_logger
+from .metrics import span, observe_size
+
+logger = get_logger("embedder")
+
 
 class EmbeddingGenerator:
     """
@@ -19,6 +23,11 @@ class EmbeddingGenerator:
     1. OpenAI (if OPENAI_API_KEY)
     2. HuggingFace API (if HUGGINGFACE_API_KEY) -> Best for free Render tier
     3. Local SentenceTransformer (fallback) -> Uses >500MB RAM, may crash free servers
+
+    EMBEDDING_BACKEND=local (the default) uses the local model even when API
+    keys are set: existing indexes built with it are 384-dimensional and
+    OpenAI's vectors are 1536, so switching is an explicit EMBEDDING_BACKEND=auto
+    on a fresh index, never a side effect of setting OPENAI_API_KEY for the LLM.
     """
     
     def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
@@ -28,39 +37,52 @@ class EmbeddingGenerator:
         
         self.mode = "local"
         self.client = None
+        self.model = None
+        force_local = os.getenv("EMBEDDING_BACKEND", "local").lower() == "local"
         
         # 1. Try OpenAI
-        if self.openai_api_key and self.openai_api_key.startswith("sk-") and not self.openai_api_key.startswith("sk-or-v1-"):
+        if not force_local and self.openai_api_key and self.openai_api_key.startswith("sk-") and not self.openai_api_key.startswith("sk-or-v1-"):
              # basic check to filter out placeholders if any
             from openai import OpenAI
             self.client = OpenAI(api_key=self.openai_api_key)
             self.mode = "openai"
             self.embedding_dim = 1536
-            print("Using OpenAI embeddings (text-embedding-ada-002)")
+            logger.info("Using OpenAI embeddings", extra={"model": "text-embedding-ada-002"})
             
         # 2. Try HuggingFace API (DISABLED)
         # elif self.hf_api_key:
         
         # 3. Fallback to Local (Heavy but reliable on HF Spaces)
         # HF Spaces has 16GB RAM, so this is perfectly fine!
-        if True: # FORCE LOCAL MODE
-            print(f"Loading local embedding model: {model_name}")
-            print("WARN: This uses significant RAM and may crash on free hosting tiers.")
+        if self.mode == "local":
+            logger.info("Loading local embedding model", extra={"model": model_name})
+            logger.warning("Local embedding model uses significant RAM and may crash on free hosting tiers")
             # Lazy import to save memory if using API
             from sentence_transformers import SentenceTransformer
             self.model = SentenceTransformer(model_name)
             self.mode = "local"
             self.embedding_dim = self.model.get_sentence_embedding_dimension()
-            print(f"Model loaded - Dimension: {self.embedding_dim}")
+            logger.info("Model loaded", extra={"dimension": self.embedding_dim})
     
+    def warm_up(self):
+        """Throwaway local encode so the first real request doesn't pay tokenizer/kernel init"""
+        if self.mode == "local":
+            self._encode(["warm up"])
+
     def embed_texts(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for multiple texts"""
         if not texts:
             raise ValueError("Cannot embed empty text list")
         
+        observe_size("rag_embed_batch_size", len(texts), mode=self.mode)
+        with span("embed", mode=self.mode, batch_size=len(texts)):
+            return self._encode(texts)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Provider-specific encoding (no instrumentation)"""
         # OPENAI
         if self.mode == "openai":
-            print(f"Embedding {len(texts)} texts via OpenAI...")
+            logger.debug("Embedding texts via OpenAI", extra={"count": len(texts)})
             embeddings = []
             for text in texts:
                 # OpenAI handles newlines poorly in embeddings sometimes
@@ -71,11 +93,12 @@ class EmbeddingGenerator:
             
         # HUGGINGFACE API
         elif self.mode == "huggingface":
-            print(f"Embedding {len(texts)} texts via HuggingFace API...")
+            logger.debug("Embedding texts via HuggingFace API", extra={"count": len(texts)})
+            import requests
             response = requests.post(self.api_url, headers=self.headers, json={"inputs": texts, "options": {"wait_for_model": True}})
             
             if response.status_code != 200:
-                print(f"HF API Error: {response.text}")
+                logger.error("HF API Error", extra={"error": response.text})
                 raise Exception(f"HuggingFace API failed: {response.text}")
                 
             embeddings = response.json()
@@ -87,10 +110,10 @@ class EmbeddingGenerator:
         
         # LOCAL
         else:
-            print(f"Embedding {len(texts)} texts locally...")
+            logger.debug("Embedding texts locally", extra={"count": len(texts)})
             embeddings = self.model.encode(
                 texts,
-                show_progress_bar=True,
+                show_progress_bar=False,
                 convert_to_numpy=True,
                 normalize_embeddings=True
             )
@@ -100,5 +123,6 @@ class EmbeddingGenerator:
         """Generate embedding for a single query"""
         # Wrap single query in list and take first result
         # This unifies the logic and works for all providers
-        embeddings = self.embed_texts([query])
+        with span("query_embed", mode=self.mode):
+            embeddings = self._encode([query])
         return embeddings[0]
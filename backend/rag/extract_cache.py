@@ -0,0 +1,180 @@
+"""
+Extraction Cache Module
+On-disk cache of extracted page text and chunker output, keyed by file
+content hash + extraction parameters, zlib-compressed, size-bounded (LRU)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+from .logger import get_logger
+
+logger = get_logger("extract_cache")
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of extraction results
+
+    Interview Note: PDF text extraction is the slowest CPU stage of ingest
+    and its output depends only on the bytes of the file and the loader /
+    chunker settings. Keying on (sha256 of the file, parameters) lets a
+    re-upload to another tenant, or after /reset, skip straight to
+    embedding. Entries are compressed JSON; least recently used entries
+    are evicted once the directory exceeds max_bytes.
+
+    Size and entry count are running totals, seeded by one directory scan;
+    the directory is only listed again when the total exceeds max_bytes,
+    or on refresh() after other processes wrote entries.
+    """
+
+    SUFFIX = ".json.z"
+
+    def __init__(self, root_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        self.root_dir = root_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Running totals (None until the first scan)
+        self._bytes: Optional[int] = None
+        self._count: Optional[int] = None
+        os.makedirs(root_dir, exist_ok=True)
+
+    # Picklable so process-pool workers can share the same on-disk cache (and start from our totals)
+    def __getstate__(self):
+        return {"root_dir": self.root_dir, "max_bytes": self.max_bytes, "bytes": self._bytes, "entries": self._count}
+
+    def __setstate__(self, state):
+        self.__init__(state["root_dir"], state["max_bytes"])
+        self._bytes, self._count = state.get("bytes"), state.get("entries")
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def key(file_hash: str, kind: str, **params) -> str:
+        """Cache key for one artefact (e.g. kind="chunks", chunk_size=400, overlap=80)"""
+        spec = json.dumps(params, sort_keys=True)
+        return hashlib.sha256(f"{file_hash}:{kind}:{spec}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.root_dir, key[:2], key + self.SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Dropping corrupt cache entry", extra={"key": key, "error": str(e)})
+            self._discard(path)
+            return None
+        try:
+            os.utime(path)  # mtime = last use, for LRU eviction
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: Any):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            self._seed()  # before this entry exists, so it isn't counted twice
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        replaced = self._size(path)
+        os.replace(tmp, path)
+        with self._lock:
+            self._bytes += len(data) - (replaced or 0)
+            self._count += replaced is None
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _entries(self):
+        for sub in os.scandir(self.root_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, st.st_size, st.st_mtime
+
+    def _seed(self):
+        """Scan once for the running totals (caller holds _lock)"""
+        if self._bytes is None:
+            entries = list(self._entries())
+            self._bytes, self._count = sum(size for _, size, _ in entries), len(entries)
+
+    def refresh(self):
+        """Re-scan the directory, e.g. after process-pool workers wrote entries this process didn't count"""
+        with self._lock:
+            self._bytes = None
+            self._seed()
+
+    def _evict(self):
+        """Drop least recently used entries until under 90% of max_bytes"""
+        with self._lock:
+            # The running total may include other processes' estimates: decide on a fresh scan
+            entries = list(self._entries())
+            total = sum(size for _, size, _ in entries)
+            count = len(entries)
+            evicted = 0
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                for path, size, _ in sorted(entries, key=lambda e: e[2]):
+                    if total <= target:
+                        break
+                    self._remove(path)
+                    total -= size
+                    count -= 1
+                    evicted += 1
+            self._bytes, self._count = total, count
+        if evicted:
+            logger.info("Evicted extraction cache entries", extra={"evicted": evicted, "bytes": total})
+
+    def _discard(self, path: str):
+        """Remove one entry and take it off the running totals"""
+        size = self._size(path)
+        self._remove(path)
+        with self._lock:
+            if size is not None and self._bytes is not None:
+                self._bytes -= size
+                self._count -= 1
+
+    @staticmethod
+    def _size(path: str) -> Optional[int]:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._seed()
+            return {"entries": self._count, "bytes": self._bytes, "max_bytes": self.max_bytes}
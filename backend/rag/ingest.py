@@ -0,0 +1,276 @@
+"""
+Ingest Module
+Per-file extraction + chunking + suggestions (optionally cached by file hash),
+a process pool to run it across many files in parallel, and semantic
+chunking of extracted pages (server side, where the embedder lives)
+"""
+
+import base64
+import multiprocessing
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .loader import PDFLoader, CSVLoader
+from .chunker import TextChunker, ChunkTable, SemanticChunker
+from .extract_cache import ExtractionCache
+from .logger import get_logger
+
+logger = get_logger("ingest")
+
+CSV_SUGGESTIONS = [
+    "List all products",
+    "What is the most expensive item?",
+    "Give me a summary of these products"
+]
+
+
+def pdf_suggestions(pages_text: List[Dict]) -> List[str]:
+    """Title-case / upper-case short lines from the first pages, as question prompts"""
+    potential_headings = []
+    for page in pages_text[:5]:
+        for line in page['text'].split('\n'):
+            line = line.strip()
+            if 4 < len(line) < 50 and not line.endswith('.'):
+                if line.isupper() or line.istitle():
+                    if not any(x in line.lower() for x in ['page', 'copyright', 'www', 'http']):
+                        potential_headings.append(line)
+
+    unique_headings = sorted(list(set(potential_headings)), key=len, reverse=True)
+    return [f"Explain about {topic}" for topic in unique_headings[:3]]
+
+
+# Bump when loader / chunker output changes, so stale cache entries are ignored
+EXTRACTOR_VERSION = 1
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 80
+# CSV rows are packed into chunks of up to this many characters (0 = one row per chunk)
+CSV_CHUNK_CHARS = int(os.getenv("CSV_CHUNK_CHARS", 1000))
+# Columns kept as vector metadata for CSV chunks (comma-separated; empty = none)
+CSV_METADATA_COLUMNS = [c.strip() for c in os.getenv("CSV_METADATA_COLUMNS", "").split(",") if c.strip()]
+# CSVs at least this large are parsed by byte range on the worker processes
+CSV_PARALLEL_MIN_MB = float(os.getenv("CSV_PARALLEL_MIN_MB", 32))
+# PDF chunking: "chars" (fixed size + overlap) or "semantic" (sentence-similarity boundaries)
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "chars").lower()
+SEMANTIC_MAX_CHARS = int(os.getenv("SEMANTIC_MAX_CHARS", 800))
+SEMANTIC_MIN_CHARS = int(os.getenv("SEMANTIC_MIN_CHARS", 200))
+SEMANTIC_BREAKPOINT_PERCENTILE = float(os.getenv("SEMANTIC_BREAKPOINT_PERCENTILE", 20))
+# Re-encode chunks whose pooled sentence vector has a norm below this (0 = always pool)
+SEMANTIC_REENCODE_BELOW = float(os.getenv("SEMANTIC_REENCODE_BELOW", 0))
+
+
+def extract_document(path: str, filename: str, cache: Optional[ExtractionCache] = None) -> Dict:
+    """
+    Extract and chunk one PDF or CSV
+
+    With a cache, results are looked up by file content hash: a hit on the
+    chunked output skips extraction and chunking entirely, a hit on the page
+    text (chunker settings changed) skips extraction.
+
+    In semantic chunking mode a PDF comes back unchunked ("chunks" is None,
+    "pages" holds the page text, "file_hash" the cache key of the file);
+    finish it with chunk_semantic().
+
+    Returns:
+        {"chunks": [...], "total_pages": int, "suggestions": [...], "cache": "hit" | "pages" | "miss" | None}
+
+    Raises:
+        ValueError: unsupported type, or nothing could be extracted
+    """
+    file_ext = os.path.splitext(filename)[1].lower()
+    if file_ext not in ('.pdf', '.csv'):
+        raise ValueError("Only PDF and CSV files are supported")
+
+    semantic = file_ext == '.pdf' and CHUNKING_MODE == "semantic"
+    file_hash = cache.file_hash(path) if cache else None
+    result_key = None
+    # Semantic chunks depend on the embedder: chunk_semantic() caches them, here only the page text is
+    if cache and not semantic:
+        params = {"v": EXTRACTOR_VERSION}
+        if file_ext == '.pdf':
+            params.update(chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
+        else:
+            params.update(chunk_chars=CSV_CHUNK_CHARS, metadata_columns=CSV_METADATA_COLUMNS)
+        result_key = cache.key(file_hash, f"{file_ext[1:]}-chunks", **params)
+        cached = cache.get(result_key)
+        if cached is not None:
+            if isinstance(cached["chunks"], dict):
+                cached["chunks"] = ChunkTable.from_state(cached["chunks"])
+            return {**cached, "suggestions": _with_default(cached["suggestions"], filename), "cache": "hit"}
+
+    cache_state = "miss" if cache else None
+    suggestions = []
+
+    if file_ext == '.pdf':
+        pages_text = None
+        pages_key = cache.key(file_hash, "pdf-pages", v=EXTRACTOR_VERSION) if cache else None
+        if cache:
+            pages_text = cache.get(pages_key)
+            if pages_text is not None:
+                cache_state = "pages"
+        if pages_text is None:
+            pages_text = PDFLoader().extract_text(path)
+            if pages_text and cache:
+                cache.put(pages_key, pages_text)
+        if not pages_text:
+            raise ValueError("Could not extract text from PDF")
+        chunks = None if semantic else TextChunker(chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP).create_chunks(pages_text)
+        total_pages = len(pages_text)
+        try:
+            suggestions = pdf_suggestions(pages_text)
+        except Exception:
+            pass
+    else:
+        loader = CSVLoader(
+            chunk_chars=CSV_CHUNK_CHARS,
+            metadata_columns=CSV_METADATA_COLUMNS,
+            parallel_min_bytes=int(CSV_PARALLEL_MIN_MB * 1024 * 1024),
+            # One range queued per worker beyond the ones being parsed keeps them busy
+            ranges_in_flight=_workers() + 1,
+        )
+        # Only the server process fans out; inside a pool worker the file is parsed serially
+        chunks = loader.extract_csv(path, executor=None if _IN_WORKER or _workers() == 1 else _pool())
+        if not chunks:
+            raise ValueError("Could not extract data from CSV")
+        total_pages = 1
+        suggestions = list(CSV_SUGGESTIONS)
+
+    result = {"chunks": chunks, "total_pages": total_pages, "suggestions": suggestions[:3]}
+    if semantic:
+        return {
+            **result, "pages": pages_text, "file_hash": file_hash,
+            "suggestions": _with_default(result["suggestions"], filename), "cache": cache_state,
+        }
+    if cache:
+        chunks_state = chunks.to_state() if isinstance(chunks, ChunkTable) else chunks
+        cache.put(result_key, {**result, "chunks": chunks_state})
+    return {**result, "suggestions": _with_default(result["suggestions"], filename), "cache": cache_state}
+
+
+def _with_default(suggestions: List[str], filename: str) -> List[str]:
+    # Filename-based defaults aren't cached: the same bytes may arrive under another name
+    return suggestions or [f"Summarize {filename}", "Key takeaways"]
+
+
+def semantic_chunker(embedder) -> SemanticChunker:
+    return SemanticChunker(
+        embedder,
+        max_chars=SEMANTIC_MAX_CHARS,
+        min_chars=SEMANTIC_MIN_CHARS,
+        breakpoint_percentile=SEMANTIC_BREAKPOINT_PERCENTILE,
+        reencode_below=SEMANTIC_REENCODE_BELOW,
+        batch_size=int(os.getenv("EMBED_BATCH_SIZE", 512)),
+    )
+
+
+def embedder_id(embedder) -> str:
+    """Identifies what produced a vector (cached vectors are only reused for the same embedder)"""
+    return f"{embedder.mode}:{getattr(embedder, 'model_name', '')}:{embedder.embedding_dim}"
+
+
+def chunk_semantic(extracted: Dict, embedder, cache: Optional[ExtractionCache] = None):
+    """
+    Chunk an extract_document() result left unchunked (semantic mode), in place
+
+    With a cache, chunks and their vectors are stored under the file hash,
+    the embedder and the semantic settings, so an unchanged re-upload
+    embeds nothing (and the incremental diff then finds nothing to add).
+
+    Returns:
+        Chunk vectors aligned with extracted["chunks"] (pooled from the
+        sentence embeddings, so they need no further embedding), or None
+        if the result was already chunked
+    """
+    if extracted.get("chunks") is not None:
+        return None
+    pages = extracted.pop("pages")
+    file_hash = extracted.pop("file_hash", None)
+    key = None
+    if cache and file_hash:
+        key = cache.key(
+            file_hash, "pdf-semantic", v=EXTRACTOR_VERSION, embedder=embedder_id(embedder),
+            max_chars=SEMANTIC_MAX_CHARS, min_chars=SEMANTIC_MIN_CHARS,
+            percentile=SEMANTIC_BREAKPOINT_PERCENTILE, reencode_below=SEMANTIC_REENCODE_BELOW,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            extracted["chunks"] = ChunkTable.from_state(cached["chunks"])
+            return _decode_vectors(cached["vectors"])
+
+    chunks, vectors = semantic_chunker(embedder).create_chunks(pages)
+    if not len(chunks):
+        raise ValueError("Could not extract text from PDF")
+    extracted["chunks"] = chunks
+    if key:
+        cache.put(key, {"chunks": chunks.to_state(), "vectors": _encode_vectors(vectors)})
+    return vectors
+
+
+def _encode_vectors(vectors: np.ndarray) -> Dict:
+    # The cache stores JSON: raw float32 bytes as base64 are ~4x smaller than float lists
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return {"shape": list(vectors.shape), "data": base64.b64encode(vectors.tobytes()).decode("ascii")}
+
+
+def _decode_vectors(state: Dict) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(state["data"]), dtype=np.float32).reshape(state["shape"]).copy()
+
+
+_POOL = None
+_IN_WORKER = False
+
+
+def _mark_worker():
+    global _IN_WORKER
+    _IN_WORKER = True
+
+
+def _workers() -> int:
+    """INGEST_PROCESSES, default min(4, CPUs); 1 means extract in-process"""
+    return max(1, int(os.getenv("INGEST_PROCESSES", min(4, os.cpu_count() or 1))))
+
+
+def _pool() -> ProcessPoolExecutor:
+    """
+    Shared worker processes
+
+    PDF parsing is pure Python, so threads would serialise on the GIL.
+    'spawn' keeps workers independent of the server's threads and locks.
+    """
+    global _POOL
+    if _POOL is None:
+        _POOL = ProcessPoolExecutor(
+            max_workers=_workers(), mp_context=multiprocessing.get_context("spawn"), initializer=_mark_worker
+        )
+    return _POOL
+
+
+def extract_many(files: List[Dict], cache: Optional[ExtractionCache] = None) -> List[Dict]:
+    """
+    Extract several files in parallel
+
+    Args:
+        files: [{"path": ..., "filename": ...}]
+
+    Returns:
+        One result per file, in order: extract_document()'s dict, or
+        {"error": message} if that file failed
+    """
+    if len(files) == 1 or _workers() == 1:
+        futures = None
+    else:
+        pool = _pool()
+        futures = [pool.submit(extract_document, f["path"], f["filename"], cache) for f in files]
+
+    results = []
+    for i, f in enumerate(files):
+        try:
+            results.append(futures[i].result() if futures else extract_document(f["path"], f["filename"], cache))
+        except Exception as e:
+            logger.warning("Extraction failed", extra={"file": f["filename"], "error": str(e)})
+            results.append({"error": str(e)})
+    # Workers wrote cache entries into the shared directory; count them here too
+    if futures and cache and any(r.get("cache") in ("miss", "pages") for r in results):
+        cache.refresh()
+    return results
@@ -0,0 +1,285 @@
+"""
+LLM Provider Module
+Resilient access to OpenAI / Groq chat models:
+per-call deadlines, hedged requests, circuit breaking and pooled clients
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+from .logger import get_logger
+from .scheduler import LLM_SCHEDULER
+
+logger = get_logger("llm_provider")
+
+
+class LLMUnavailable(Exception):
+    """Raised when a provider times out, fails, or its circuit is open"""
+
+
+# Shared pool for deadline-bounded and hedged calls
+_LLM_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="rag-llm")
+
+# Pooled clients / resilient wrappers, keyed by config (QuestionAnswerer is per request)
+_PROVIDERS: Dict[tuple, "ResilientLLM"] = {}
+_PROVIDERS_LOCK = threading.Lock()
+
+
+class OpenAIProvider:
+    """OpenAI chat completions (or any OpenAI-compatible server via base_url)"""
+
+    name = "openai"
+
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo", base_url: Optional[str] = None, timeout: float = 20.0):
+        from openai import OpenAI
+        self.model = model
+        # Retries are handled by hedging / circuit breaking, not by the SDK
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+
+    def complete(self, messages: List[Dict], temperature: float = 0.3, max_tokens: Optional[int] = None) -> str:
+        kwargs = {"model": self.model, "messages": messages, "temperature": temperature}
+        if max_tokens:
+            kwargs["max_tokens"] = max_tokens
+        response = self.client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
+
+
+class GroqProvider:
+    """Groq chat via langchain_groq"""
+
+    name = "groq"
+
+    def __init__(self, api_key: str, model: str = "llama-3.1-8b-instant", base_url: Optional[str] = None, timeout: float = 20.0):
+        from langchain_groq import ChatGroq
+        self.model = model
+        kwargs = dict(
+            groq_api_key=api_key,
+            model_name=model,
+            temperature=0.1,
+            max_tokens=512,
+            timeout=timeout,
+            max_retries=0,
+        )
+        if base_url:
+            kwargs["base_url"] = base_url
+        self.llm = ChatGroq(**kwargs)
+
+    def complete(self, messages: List[Dict], temperature: Optional[float] = None, max_tokens: Optional[int] = None) -> str:
+        # ChatGroq is configured once per pooled client; per-call overrides go through bind()
+        llm = self.llm
+        overrides = {}
+        if temperature is not None:
+            overrides["temperature"] = temperature
+        if max_tokens:
+            overrides["max_tokens"] = max_tokens
+        if overrides:
+            llm = llm.bind(**overrides)
+        return llm.invoke(messages).content
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `cooldown` seconds (one trial call allowed);
+    half-open -> closed on success, open again on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half-open"
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.state = "closed"
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class ResilientLLM:
+    """
+    Wraps a provider with a deadline, optional hedging and a circuit breaker
+
+    Interview Note: A degraded provider should cost at most `timeout` seconds
+    per request, and after a few failures it costs nothing at all: the breaker
+    opens and callers go straight to the excerpt fallback.
+    """
+
+    def __init__(
+        self,
+        provider,
+        timeout: float = 20.0,
+        hedge: bool = False,
+        hedge_min_samples: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.provider = provider
+        self.name = provider.name
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "failures": 0, "timeouts": 0, "hedged": 0, "hedge_wins": 0, "short_circuited": 0}
+
+    def complete(self, messages: List[Dict], temperature: float = 0.3, max_tokens: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """
+        Call the provider within the deadline or raise LLMUnavailable
+
+        Waits for an LLM_SCHEDULER slot first (raises scheduler.Overloaded if
+        the caller's queue is full); the deadline starts once the slot is held.
+        The slot stays taken until the provider call itself returns, even if
+        that is after the deadline, so hung calls count against concurrency.
+        """
+        permit = LLM_SCHEDULER.acquire()
+        return self._complete(messages, temperature, max_tokens, timeout, permit)
+
+    def _complete(self, messages: List[Dict], temperature: float, max_tokens: Optional[int], timeout: Optional[float], permit) -> str:
+        deadline = timeout if timeout is not None else self.timeout
+        self._bump("calls")
+
+        if not self.breaker.allow():
+            LLM_SCHEDULER.release(permit)
+            self._bump("short_circuited")
+            raise LLMUnavailable(f"{self.name} circuit open")
+
+        start = time.monotonic()
+        primary = self._submit(permit, messages, temperature, max_tokens)
+        pending = {primary}
+
+        hedge_after = self._hedge_delay()
+        if hedge_after is not None and hedge_after < deadline:
+            done, _ = wait(pending, timeout=hedge_after)
+            # The duplicate needs a slot of its own; skip it rather than queue behind other requests
+            hedge_permit = LLM_SCHEDULER.try_acquire() if not done else None
+            if hedge_permit is not None:
+                self._bump("hedged")
+                pending.add(self._submit(hedge_permit, messages, temperature, max_tokens))
+
+        error = None
+        while pending:
+            remaining = deadline - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is not primary:
+                    self._bump("hedge_wins")
+                self._record_latency(time.monotonic() - start)
+                self.breaker.record_success()
+                return result
+
+        self.breaker.record_failure()
+        if error is not None and not pending:
+            self._bump("failures")
+            raise LLMUnavailable(f"{self.name} failed: {error}")
+        self._bump("timeouts")
+        raise LLMUnavailable(f"{self.name} exceeded {deadline:.1f}s deadline")
+
+    def _submit(self, permit, messages: List[Dict], temperature: float, max_tokens: Optional[int]) -> Future:
+        """One provider call on the pool, releasing its scheduler slot when the call returns"""
+        try:
+            future = _LLM_POOL.submit(self.provider.complete, messages, temperature, max_tokens)
+        except BaseException:
+            LLM_SCHEDULER.release(permit)
+            raise
+        future.add_done_callback(lambda _: LLM_SCHEDULER.release(permit))
+        return future
+
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def _hedge_delay(self) -> Optional[float]:
+        return self.p95() if self.hedge else None
+
+    def _record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _bump(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> Dict:
+        """Stats for status endpoints"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["provider"] = self.name
+        stats["circuit"] = self.breaker.state
+        stats["p95_s"] = self.p95()
+        return stats
+
+
+def get_llm() -> Optional[ResilientLLM]:
+    """
+    Return the pooled ResilientLLM for the current environment, or None
+
+    Priority: OpenAI (sk- key or OPENAI_BASE_URL stand-in) -> Groq.
+    Clients and breaker state are shared across requests.
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    openai_base_url = os.getenv("OPENAI_BASE_URL")
+    groq_api_key = os.getenv("GROQ_API_KEY") or (openai_api_key if openai_api_key and openai_api_key.startswith("gsk_") else None)
+
+    timeout = float(os.getenv("LLM_TIMEOUT_S", 20))
+    hedge = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    failures = int(os.getenv("LLM_BREAKER_FAILURES", 3))
+    cooldown = float(os.getenv("LLM_BREAKER_COOLDOWN_S", 30))
+
+    if openai_api_key and (openai_api_key.startswith("sk-") or openai_base_url):
+        key = ("openai", openai_api_key, openai_base_url, timeout, hedge, failures, cooldown)
+        factory = lambda: OpenAIProvider(openai_api_key, base_url=openai_base_url, timeout=timeout)
+    elif groq_api_key:
+        groq_base_url = os.getenv("GROQ_BASE_URL")
+        key = ("groq", groq_api_key, groq_base_url, timeout, hedge, failures, cooldown)
+        factory = lambda: GroqProvider(groq_api_key, base_url=groq_base_url, timeout=timeout)
+    else:
+        return None
+
+    with _PROVIDERS_LOCK:
+        llm = _PROVIDERS.get(key)
+        if llm is None:
+            llm = ResilientLLM(factory(), timeout=timeout, hedge=hedge, breaker=CircuitBreaker(failures, cooldown))
+            _PROVIDERS[key] = llm
+            logger.info("LLM initialized", extra={"provider": llm.name, "model": llm.provider.model, "timeout_s": timeout, "hedge": hedge})
+        return llm
+
+
+def active_llms() -> List[ResilientLLM]:
+    """Every pooled provider created so far (for metrics collectors)"""
+    with _PROVIDERS_LOCK:
+        return list(_PROVIDERS.values())
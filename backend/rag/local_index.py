@@ -0,0 +1,795 @@
+"""
+Local Vector Index Module
+In-process numpy vector index with a Pinecone-compatible surface,
+tombstone deletes and background compaction
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logger import get_logger
+from .metrics import REGISTRY
+from .reduction import Projection, ReductionConfig
+
+logger = get_logger("local_index")
+
+
+class NamespaceIndex:
+    """
+    One namespace: a dense float32 matrix (L2-normalised rows) plus ids/metadata
+
+    Deleted rows are tombstoned (alive=False) and skipped at query time; once
+    the dead fraction passes a threshold the matrix is compacted in the
+    background so query cost tracks the live corpus only.
+
+    With a ReductionConfig the searched matrix holds projected rows
+    (`dimension` wide) and, when needed for fitting / re-scoring, the
+    full-width rows are kept alongside as float16.
+
+    Rows are also grouped by their "document_id" metadata, with a running
+    vector sum per document, so a query can first pick the documents whose
+    centroids are closest and then score only those documents' rows.
+    """
+
+    def __init__(self, dimension: int, reduction: Optional[ReductionConfig] = None):
+        self.full_dim = dimension
+        self.reduction = reduction if reduction is not None and reduction.enabled else None
+        self.projection: Optional[Projection] = None
+        if self.reduction and self.reduction.method == "prefix":
+            self.projection = Projection.prefix(self.reduction.dim)
+        # Width of the searched matrix
+        self.dimension = self.projection.dim if self.projection else dimension
+        # Row buffers grow geometrically so batched upserts stay amortised O(1) per row
+        self._matrix_buf = np.zeros((0, self.dimension), dtype=np.float32)
+        self._alive_buf = np.zeros(0, dtype=bool)
+        keep_full = self.reduction is not None and self.reduction.keep_full()
+        self._full_buf = np.zeros((0, dimension), dtype=np.float16) if keep_full else None
+        self.ids: List[str] = []
+        self.metadata: List[Dict] = []
+        self.row_of: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        # Taken before lock, never after; re-entrant so eviction can save while holding it
+        self.save_lock = threading.RLock()
+        self.compacting = False
+        # Unsaved changes (must be written before the shard can be evicted)
+        self.dirty = False
+        # Set once evicted from memory; holders of a stale reference must re-fetch
+        self.evicted = False
+        # Rough size of ids + metadata, for the memory budget
+        self.meta_bytes = 0
+        # document_id -> rows (dead ones included until compaction), live row count, sum of live rows
+        self.doc_rows: Dict[str, List[int]] = {}
+        self.doc_live: Dict[str, int] = {}
+        self.doc_sum: Dict[str, np.ndarray] = {}
+        # (normalised centroid matrix, row array and live count per document), rebuilt lazily after changes
+        self._routing = None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix_buf[:len(self.ids)]
+
+    @property
+    def alive(self) -> np.ndarray:
+        return self._alive_buf[:len(self.ids)]
+
+    @property
+    def full(self) -> Optional[np.ndarray]:
+        return self._full_buf[:len(self.ids)] if self._full_buf is not None else None
+
+    def _set_rows(self, matrix: np.ndarray, full: Optional[np.ndarray] = None):
+        self._matrix_buf = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._alive_buf = np.ones(len(matrix), dtype=bool)
+        if self._full_buf is not None:
+            self._full_buf = np.ascontiguousarray(full, dtype=np.float16)
+
+    def _reserve(self, rows: int):
+        capacity = self._matrix_buf.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(rows, capacity * 2, 64)
+        matrix = np.zeros((new_capacity, self.dimension), dtype=np.float32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        n = len(self.ids)
+        matrix[:n] = self._matrix_buf[:n]
+        alive[:n] = self._alive_buf[:n]
+        self._matrix_buf, self._alive_buf = matrix, alive
+        if self._full_buf is not None:
+            full = np.zeros((new_capacity, self.full_dim), dtype=np.float16)
+            full[:n] = self._full_buf[:n]
+            self._full_buf = full
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size: row buffers plus ids/metadata"""
+        full = self._full_buf.nbytes if self._full_buf is not None else 0
+        return self._matrix_buf.nbytes + self._alive_buf.nbytes + full + self.meta_bytes
+
+    @property
+    def live_count(self) -> int:
+        return len(self.row_of)
+
+    @property
+    def dead_count(self) -> int:
+        return len(self.ids) - len(self.row_of)
+
+    def stats(self) -> Dict:
+        return {
+            "vector_count": self.live_count, "tombstones": self.dead_count, "dimension": self.dimension,
+            "documents": sum(1 for n in self.doc_live.values() if n > 0),
+        }
+
+    def upsert(self, vectors: List[Dict]):
+        if not vectors:
+            return
+        values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values = values / np.maximum(norms, 1e-12)
+
+        with self.lock:
+            # Re-upserted ids: tombstone the old row, append the new one
+            for v in vectors:
+                old = self.row_of.pop(v["id"], None)
+                if old is not None:
+                    self.alive[old] = False
+                    self._doc_remove(old)
+            start = len(self.ids)
+            self._reserve(start + len(vectors))
+            if self._full_buf is not None:
+                self._full_buf[start:start + len(vectors)] = values
+            self._matrix_buf[start:start + len(vectors)] = self.projection.apply(values) if self.projection else values
+            self._alive_buf[start:start + len(vectors)] = True
+            for offset, v in enumerate(vectors):
+                metadata = dict(v.get("metadata") or {})
+                self.ids.append(v["id"])
+                self.metadata.append(metadata)
+                self.row_of[v["id"]] = start + offset
+                self.meta_bytes += _meta_size(v["id"], metadata)
+                self._doc_add(start + offset)
+            self.dirty = True
+            self._maybe_fit()
+
+    def _maybe_fit(self):
+        """Fit PCA once the namespace is big enough, and re-project every row"""
+        if self.reduction is None or self.projection is not None or self._full_buf is None:
+            return
+        if self.live_count < self.reduction.min_vectors:
+            return
+        full = self.full.astype(np.float32)
+        projection = Projection.fit_pca(full[self.alive], self.reduction.dim)
+        matrix = np.zeros((self._matrix_buf.shape[0], projection.dim), dtype=np.float32)
+        matrix[:len(full)] = projection.apply(full)
+        self._matrix_buf = matrix
+        self.projection = projection
+        self.dimension = projection.dim
+        if not self.reduction.keep_full(fitted=True):
+            # Without re-scoring nothing reads the full-width rows again
+            self._full_buf = None
+        # Document sums live in the searched space
+        self._rebuild_documents()
+        logger.info("Fitted PCA projection", extra={
+            "from_dim": self.full_dim, "to_dim": projection.dim,
+            "explained_variance": round(projection.explained, 4), "vectors": self.live_count,
+        })
+
+    def restore(self, matrix: np.ndarray, full: Optional[np.ndarray], projection: Optional[Projection], ids: List[str], metadata: List[Dict]):
+        """
+        Populate from saved rows. A saved projection wins over the configured
+        one (the rows were written with it); a full-width shard saved before
+        reduction was enabled is projected now.
+        """
+        if matrix.shape[1] == self.full_dim:
+            full, projection = matrix, self.projection
+        elif projection is None:
+            raise ValueError(f"Saved rows are {matrix.shape[1]}-dim but no projection was saved")
+        if self.reduction is not None and self.reduction.keep_full(fitted=projection is not None) and full is not None:
+            self._full_buf = np.zeros((0, self.full_dim), dtype=np.float16)
+        else:
+            self._full_buf = None
+        self.projection = projection
+        self.dimension = projection.dim if projection else self.full_dim
+        if projection is not None and matrix.shape[1] == self.full_dim:
+            matrix = projection.apply(matrix)
+        self._set_rows(matrix, full)
+        self.ids = ids
+        self.metadata = metadata
+        self.row_of = {vid: row for row, vid in enumerate(ids)}
+        self.meta_bytes = sum(_meta_size(vid, m) for vid, m in zip(ids, metadata))
+        self._rebuild_documents()
+        self._maybe_fit()
+
+    def delete_ids(self, ids: List[str]) -> int:
+        removed = 0
+        with self.lock:
+            for vector_id in ids:
+                row = self.row_of.pop(vector_id, None)
+                if row is not None:
+                    self.alive[row] = False
+                    self._doc_remove(row)
+                    removed += 1
+            if removed:
+                self.dirty = True
+        return removed
+
+    def delete_where(self, metadata_filter: Dict) -> int:
+        with self.lock:
+            rows = [row for row in self.row_of.values() if _matches(self.metadata[row], metadata_filter)]
+            return self.delete_ids([self.ids[row] for row in rows])
+
+    def update_metadata(self, vector_id: str, values: Dict):
+        with self.lock:
+            row = self.row_of.get(vector_id)
+            if row is not None:
+                self.metadata[row].update(values)
+                self.dirty = True
+
+    def query(self, vector: np.ndarray, top_k: int, metadata_filter: Optional[Dict] = None, documents: int = 0) -> List[Dict]:
+        return self.query_many([vector], top_k, metadata_filter, documents)[0]
+
+    def query_many(self, vectors, top_k: int, metadata_filter: Optional[Dict] = None, documents: int = 0) -> List[List[Dict]]:
+        """
+        Top-k for a batch of query vectors: one (queries x rows) matrix product
+        and a row-wise argpartition, instead of one pass over the matrix per query
+
+        documents > 0: two-stage search. Each query is scored against the
+        document centroids first and only the rows of its `documents` best
+        documents are searched (all rows if the namespace has no more
+        documents than that, or they hold fewer than top_k live rows).
+        """
+        q = np.asarray(vectors, dtype=np.float32).reshape(-1, self.full_dim)
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+
+        with self.lock:
+            matrix, alive, ids, metadata = self.matrix, self.alive, self.ids, self.metadata
+            projection, full = self.projection, self.full
+            if metadata_filter:
+                mask = alive.copy()
+                for row in np.flatnonzero(alive):
+                    if not _matches(metadata[row], metadata_filter):
+                        mask[row] = False
+            else:
+                mask = alive
+            searched = projection.apply(q) if projection else q
+            routes = self._route(searched, documents) if documents > 0 and not metadata_filter else None
+        # Re-scoring: shortlist more candidates in the reduced space, rank them at full width
+        rescore = self.reduction.rescore if projection is not None and full is not None and self.reduction is not None else 0
+
+        if routes is None:
+            REGISTRY.inc("rag_index_rows_scanned_total", len(q) * len(ids), help="Rows scored by local index queries", mode="full")
+            return self._rank(q, searched, matrix, full, mask, top_k, ids, metadata, rescore)
+
+        best, live_rows, doc_rows = routes
+        # Too few live rows to fill top_k from the chosen documents: search everything
+        routed_ok = live_rows >= top_k
+        results: List[Optional[List[Dict]]] = [None] * len(q)
+        fallback = np.flatnonzero(~routed_ok)
+        if len(fallback):
+            REGISTRY.inc("rag_index_rows_scanned_total", len(fallback) * len(ids), help="Rows scored by local index queries", mode="full")
+            ranked = self._rank(q[fallback], searched[fallback], matrix, full, mask, top_k, ids, metadata, rescore)
+            for i, matches in zip(fallback.tolist(), ranked):
+                results[i] = matches
+        routed = np.flatnonzero(routed_ok)
+        if len(routed):
+            scores, positions = self._score_routed(searched[routed], matrix, mask, best[routed], doc_rows)
+            REGISTRY.inc("rag_index_rows_scanned_total", sum(len(doc_rows[d]) for d in best[routed].flat), help="Rows scored by local index queries", mode="routed")
+            ranked = self._select(q[routed], scores, positions, int(live_rows[routed].min()), full, top_k, ids, metadata, rescore)
+            for i, matches in zip(routed.tolist(), ranked):
+                results[i] = matches
+        return results
+
+    @staticmethod
+    def _score_routed(searched: np.ndarray, matrix: np.ndarray, mask: np.ndarray, best: np.ndarray,
+                      doc_rows: List[np.ndarray]):
+        """
+        (queries x rows) scores of each query against the rows of its own
+        documents, and the row number of every score. One matrix product per
+        document chosen in the batch, shared by all queries that chose it;
+        columns a query doesn't use are -inf.
+        """
+        lengths = np.asarray([len(rows) for rows in doc_rows], dtype=np.int64)
+        spans = lengths[best]
+        offsets = np.cumsum(spans, axis=1) - spans
+        width = int(spans.sum(axis=1).max())
+        scores = np.full((len(searched), width), -np.inf, dtype=np.float32)
+        positions = np.zeros((len(searched), width), dtype=np.int64)
+        for doc in np.unique(best):
+            queries, slot = np.nonzero(best == doc)
+            rows = doc_rows[doc]
+            block = searched[queries] @ matrix[rows].T
+            block[:, ~mask[rows]] = -np.inf
+            columns = offsets[queries, slot][:, None] + np.arange(len(rows))
+            scores[queries[:, None], columns] = block
+            positions[queries[:, None], columns] = rows
+        return scores, positions
+
+    @staticmethod
+    def _rank(q: np.ndarray, searched: np.ndarray, matrix: np.ndarray, full: Optional[np.ndarray], mask: np.ndarray,
+              top_k: int, ids: List[str], metadata: List[Dict], rescore: int = 0) -> List[List[Dict]]:
+        if matrix.shape[0] == 0:
+            return [[] for _ in range(len(q))]
+        scores = searched @ matrix.T
+        scores[:, ~mask] = -np.inf
+        return NamespaceIndex._select(q, scores, None, int(np.count_nonzero(mask)), full, top_k, ids, metadata, rescore)
+
+    @staticmethod
+    def _select(q: np.ndarray, scores: np.ndarray, positions: Optional[np.ndarray], live: int, full: Optional[np.ndarray],
+                top_k: int, ids: List[str], metadata: List[Dict], rescore: int = 0) -> List[List[Dict]]:
+        """
+        Top-k per row of `scores` (columns are matrix rows, or the row numbers in
+        `positions`); live: fewest searchable columns of any query
+        """
+        k = min(top_k, live)
+        if k <= 0:
+            return [[] for _ in range(len(q))]
+        candidates = min(top_k * rescore, live) if rescore else k
+        top = np.argpartition(-scores, candidates - 1, axis=1)[:, :candidates]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        if positions is not None:
+            top = np.take_along_axis(positions, top, axis=1)
+        if rescore:
+            top_scores = np.einsum("qcd,qd->qc", full[top].astype(np.float32), q)
+        order = np.argsort(-top_scores, axis=1, kind="stable")[:, :k]
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        return [
+            [{"id": ids[r], "score": float(s), "metadata": metadata[r]} for r, s in zip(hits, hit_scores)]
+            for hits, hit_scores in zip(top.tolist(), top_scores.tolist())
+        ]
+
+    # -------------------------------
+    # DOCUMENT ROUTING
+    # -------------------------------
+    def _doc_add(self, row: int):
+        doc = self.metadata[row].get("document_id", "")
+        self.doc_rows.setdefault(doc, []).append(row)
+        self.doc_live[doc] = self.doc_live.get(doc, 0) + 1
+        total = self.doc_sum.get(doc)
+        self.doc_sum[doc] = self._matrix_buf[row].copy() if total is None else total + self._matrix_buf[row]
+        self._routing = None
+
+    def _doc_remove(self, row: int):
+        doc = self.metadata[row].get("document_id", "")
+        if doc in self.doc_live:
+            self.doc_live[doc] -= 1
+            self.doc_sum[doc] = self.doc_sum[doc] - self._matrix_buf[row]
+        self._routing = None
+
+    def _rebuild_documents(self):
+        self.doc_rows, self.doc_live, self.doc_sum = {}, {}, {}
+        for row in np.flatnonzero(self.alive).tolist():
+            doc = self.metadata[row].get("document_id", "")
+            self.doc_rows.setdefault(doc, []).append(row)
+            self.doc_live[doc] = self.doc_live.get(doc, 0) + 1
+        matrix = self.matrix
+        for doc, rows in self.doc_rows.items():
+            self.doc_sum[doc] = matrix[rows].sum(axis=0)
+        self._routing = None
+
+    def _route(self, searched: np.ndarray, documents: int) -> Optional[Tuple[np.ndarray, np.ndarray, List[np.ndarray]]]:
+        """
+        (chosen document positions per query, live rows they hold per query,
+        rows of each document), or None if routing can't narrow anything
+        """
+        if self._routing is None:
+            docs = [d for d, n in self.doc_live.items() if n > 0]
+            if not docs:
+                return None
+            sums = np.stack([self.doc_sum[d] for d in docs]).astype(np.float32)
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+            self._routing = (
+                centroids,
+                [np.asarray(self.doc_rows[d], dtype=np.int64) for d in docs],
+                np.asarray([self.doc_live[d] for d in docs], dtype=np.int64),
+            )
+        centroids, rows, live = self._routing
+        if len(rows) <= documents:
+            return None
+
+        doc_scores = searched @ centroids.T
+        best = np.argpartition(-doc_scores, documents - 1, axis=1)[:, :documents]
+        return best, live[best].sum(axis=1), rows
+
+    def compact(self):
+        """Drop tombstoned rows and renumber the remaining ones"""
+        with self.lock:
+            keep = np.flatnonzero(self.alive)
+            ids = [self.ids[r] for r in keep]
+            metadata = [self.metadata[r] for r in keep]
+            self._set_rows(self.matrix[keep], self.full[keep] if self._full_buf is not None else None)
+            self.ids = ids
+            self.metadata = metadata
+            self.row_of = {vid: row for row, vid in enumerate(ids)}
+            self.meta_bytes = sum(_meta_size(vid, m) for vid, m in zip(ids, metadata))
+            self._rebuild_documents()
+            self.dirty = True
+
+
+def _meta_size(vector_id: str, metadata: Dict) -> int:
+    # Python object overhead dominates short values; ~100 bytes per entry is a fair floor
+    return 100 + len(vector_id) + sum(len(str(v)) for v in metadata.values())
+
+
+def _matches(metadata: Dict, metadata_filter: Dict) -> bool:
+    """Subset of Pinecone filter syntax: {field: value}, {field: {"$eq"|"$ne"|"$in"|"$nin": ...}}"""
+    for field, condition in metadata_filter.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            for op, target in condition.items():
+                if op == "$eq" and value != target:
+                    return False
+                if op == "$ne" and value == target:
+                    return False
+                if op == "$in" and value not in target:
+                    return False
+                if op == "$nin" and value in target:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+class LocalVectorIndex:
+    """
+    Drop-in for a Pinecone Index handle (upsert / query / delete / update /
+    describe_index_stats) backed by in-memory numpy namespaces
+
+    Interview Note: Lets the app run without Pinecone credentials and gives
+    us full control over deletes: tombstones make delete O(1), and a
+    background compaction reclaims the rows once enough are dead.
+
+    Each namespace (tenant) is a separate shard on disk, loaded on first use
+    and kept in an LRU bounded by max_bytes; cold shards are written back if
+    dirty and dropped from memory, so a long tail of tenants fits one node.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        persist_dir: Optional[str] = None,
+        compact_threshold: float = 0.2,
+        max_bytes: int = 0,
+        reduction: Optional[ReductionConfig] = None,
+    ):
+        self.dimension = dimension
+        self.reduction = reduction
+        self.persist_dir = persist_dir
+        self.compact_threshold = compact_threshold
+        # 0 = unbounded; eviction needs somewhere to write shards back to
+        self.max_bytes = max_bytes if persist_dir else 0
+        self.namespaces: "OrderedDict[str, NamespaceIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per-shard load locks, dropped once no thread is loading or waiting on that shard
+        self._loading: Dict[str, threading.Lock] = {}
+        self._loading_users: Dict[str, int] = {}
+        # Vectors / shards on disk but not resident: running totals, seeded by one scan of the shard files
+        self._cold_vectors: Optional[int] = None
+        self._cold_shards: Optional[int] = None
+        if persist_dir:
+            os.makedirs(persist_dir, exist_ok=True)
+
+    def _namespace(self, namespace: str, create: bool = True) -> Optional[NamespaceIndex]:
+        with self._lock:
+            ns = self.namespaces.get(namespace)
+            if ns is not None:
+                self.namespaces.move_to_end(namespace)
+                REGISTRY.inc("rag_index_shard_events_total", help="Local index shard hits / loads / evictions", event="hit")
+                return ns
+            load_lock = self._loading.setdefault(namespace, threading.Lock())
+            self._loading_users[namespace] = self._loading_users.get(namespace, 0) + 1
+
+        # One loader per shard; other threads wait for it instead of loading twice
+        try:
+            with load_lock:
+                with self._lock:
+                    ns = self.namespaces.get(namespace)
+                if ns is None:
+                    ns = self._load(namespace)
+                    if ns is None and not create:
+                        return None
+                    if ns is None:
+                        ns = NamespaceIndex(self.dimension, self.reduction)
+                    with self._lock:
+                        self.namespaces[namespace] = ns
+                        if self._cold_vectors is not None and ns.live_count:
+                            self._cold_vectors -= ns.live_count
+                            self._cold_shards -= 1
+        finally:
+            with self._lock:
+                self._loading_users[namespace] -= 1
+                if not self._loading_users[namespace]:
+                    del self._loading_users[namespace]
+                    del self._loading[namespace]
+        self._evict_cold(keep=namespace)
+        return ns
+
+    def _mutate(self, namespace: str, fn: Callable[[NamespaceIndex], object], create: bool = True):
+        """Run fn on a resident shard, re-fetching if it was evicted meanwhile"""
+        while True:
+            ns = self._namespace(namespace, create=create)
+            if ns is None:
+                return None
+            with ns.lock:
+                if ns.evicted:
+                    continue
+                result = fn(ns)
+            self._evict_cold(keep=namespace)
+            return result
+
+    # -------------------------------
+    # PINECONE-COMPATIBLE SURFACE
+    # -------------------------------
+    def upsert(self, vectors: List[Dict], namespace: str = "default"):
+        self._mutate(namespace, lambda ns: ns.upsert(vectors))
+
+    def query(self, vector, top_k: int = 3, include_metadata: bool = True, namespace: str = "default", filter: Optional[Dict] = None,
+              documents: int = 0, **kwargs) -> Dict:
+        """documents > 0: search only the chunks of the `documents` documents nearest the query (no Pinecone equivalent)"""
+        # Reads can finish on an evicted shard object; its data is still valid
+        ns = self._namespace(namespace, create=False)
+        if ns is None:
+            return {"matches": [], "namespace": namespace}
+        return {"matches": ns.query(vector, top_k, filter, documents), "namespace": namespace}
+
+    def query_many(self, vectors, top_k: int = 3, namespace: str = "default", filter: Optional[Dict] = None, documents: int = 0, **kwargs) -> List[Dict]:
+        """Batched query (no Pinecone equivalent): one response per vector, in order"""
+        ns = self._namespace(namespace, create=False)
+        if ns is None:
+            return [{"matches": [], "namespace": namespace} for _ in range(len(vectors))]
+        return [{"matches": matches, "namespace": namespace} for matches in ns.query_many(vectors, top_k, filter, documents)]
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, namespace: str = "default", filter: Optional[Dict] = None, **kwargs):
+        if delete_all:
+            with self._lock:
+                ns = self.namespaces.pop(namespace, None)
+                if ns is None and self._cold_vectors is not None:
+                    rows = self._disk_rows(self._file_base(namespace)) if self.persist_dir else None
+                    if rows:
+                        self._cold_vectors -= rows
+                        self._cold_shards -= 1
+            if ns is None:
+                self._remove_files(namespace)
+                return
+            with ns.lock:
+                ns.evicted = True
+            # save_lock: don't race an in-flight compaction save that would recreate the files
+            with ns.save_lock:
+                self._remove_files(namespace)
+            return
+
+        def apply(ns: NamespaceIndex):
+            if ids:
+                ns.delete_ids(ids)
+            if filter:
+                ns.delete_where(filter)
+            return ns
+
+        ns = self._mutate(namespace, apply, create=False)
+        if ns is not None:
+            self._maybe_compact(namespace, ns)
+
+    def update(self, id: str, set_metadata: Optional[Dict] = None, namespace: str = "default", **kwargs):
+        if set_metadata:
+            self._mutate(namespace, lambda ns: ns.update_metadata(id, set_metadata), create=False)
+
+    def describe_index_stats(self, **kwargs) -> Dict:
+        """
+        Stats for resident shards, totals for shards evicted to disk, plus
+        shard counts / memory for the whole index
+        """
+        with self._lock:
+            namespaces = dict(self.namespaces)
+            self._seed_cold()
+            cold_vectors, cold_shards = self._cold_vectors, self._cold_shards
+        resident_vectors = sum(ns.live_count for ns in namespaces.values())
+        return {
+            "dimension": self.dimension,
+            "namespaces": {name: ns.stats() for name, ns in namespaces.items()},
+            "total_vector_count": resident_vectors + cold_vectors,
+            "resident_vector_count": resident_vectors,
+            "resident_tombstones": sum(ns.dead_count for ns in namespaces.values()),
+            "evicted_vector_count": cold_vectors,
+            "evicted_shards": cold_shards,
+            "resident_shards": len(namespaces),
+            "resident_bytes": sum(ns.nbytes for ns in namespaces.values()),
+            "max_bytes": self.max_bytes,
+            "shards_on_disk": self._count_shard_files(),
+        }
+
+    # -------------------------------
+    # MEMORY BUDGET (LRU EVICTION)
+    # -------------------------------
+    def _evict_cold(self, keep: Optional[str] = None):
+        """Write back and drop least recently used shards until under max_bytes"""
+        if not self.max_bytes:
+            return
+        while True:
+            with self._lock:
+                total = sum(ns.nbytes for ns in self.namespaces.values())
+                if total <= self.max_bytes:
+                    return
+                victim = next((name for name in self.namespaces if name != keep), None)
+                if victim is None:
+                    return  # the one shard in use is bigger than the budget on its own
+                ns = self.namespaces[victim]
+            # Save outside the index lock; hold the shard lock so no writer sneaks in.
+            # save_lock before ns.lock, the order _save_shard (save, compaction) takes them in
+            with ns.save_lock, ns.lock:
+                if ns.evicted:
+                    continue
+                if ns.dirty:
+                    self._save_shard(victim, ns)
+                ns.evicted = True
+            with self._lock:
+                if self.namespaces.get(victim) is ns:
+                    del self.namespaces[victim]
+                    if self._cold_vectors is not None and ns.live_count:
+                        self._cold_vectors += ns.live_count
+                        self._cold_shards += 1
+            REGISTRY.inc("rag_index_shard_events_total", help="Local index shard hits / loads / evictions", event="evict")
+            logger.debug("Evicted index shard", extra={"namespace": victim, "bytes": ns.nbytes})
+
+    # -------------------------------
+    # COMPACTION
+    # -------------------------------
+    def _maybe_compact(self, namespace: str, ns: NamespaceIndex):
+        total = len(ns.ids)
+        if total == 0 or ns.dead_count / total < self.compact_threshold:
+            return
+        with ns.lock:
+            if ns.compacting:
+                return
+            ns.compacting = True
+
+        def run():
+            try:
+                with ns.lock:
+                    if ns.evicted:
+                        return
+                    ns.compact()
+                self._save_shard(namespace, ns)
+                logger.info("Compacted namespace", extra={"namespace": namespace, "live_vectors": ns.live_count})
+            finally:
+                ns.compacting = False
+
+        threading.Thread(target=run, name=f"compact-{namespace}", daemon=True).start()
+
+    def compact(self, namespace: Optional[str] = None):
+        """Synchronously compact one or all resident namespaces"""
+        with self._lock:
+            targets = [(namespace, self.namespaces.get(namespace))] if namespace else list(self.namespaces.items())
+        for _, ns in targets:
+            if ns is not None:
+                ns.compact()
+
+    # -------------------------------
+    # PERSISTENCE
+    # -------------------------------
+    def _file_base(self, namespace: str) -> str:
+        safe = re.sub(r"[^A-Za-z0-9_\-]", "_", namespace)[:64]
+        # Hash suffix keeps distinct namespaces distinct after sanitising
+        digest = hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.persist_dir, f"{safe}-{digest}")
+
+    def save(self, namespace: Optional[str] = None):
+        """Persist one or all resident namespaces (.npy matrix + .json ids/metadata)"""
+        if not self.persist_dir:
+            return
+        with self._lock:
+            targets = [(namespace, self.namespaces.get(namespace))] if namespace else list(self.namespaces.items())
+        for name, ns in targets:
+            if ns is not None:
+                self._save_shard(name, ns)
+
+    def _save_shard(self, name: str, ns: NamespaceIndex):
+        """Write live rows of a shard; save_lock serialises writers (compaction, upload, eviction)"""
+        if not self.persist_dir:
+            return
+        with ns.save_lock:
+            with ns.lock:
+                if ns.evicted:
+                    return  # dropped or deleted; its files are no longer ours to write
+                keep = np.flatnonzero(ns.alive)
+                matrix = ns.matrix[keep]
+                full = ns.full[keep] if ns.full is not None else None
+                projection = ns.projection
+                ids = [ns.ids[r] for r in keep]
+                metadata = [ns.metadata[r] for r in keep]
+                ns.dirty = False
+            base = self._file_base(name)
+            # Projection and full-width rows first, so the .json never refers to rows that aren't there
+            if projection is not None:
+                projection.save(base + ".tmp.proj.npz")
+                os.replace(base + ".tmp.proj.npz", base + ".proj.npz")
+            if full is not None:
+                np.save(base + ".tmp.full.npy", full)
+                os.replace(base + ".tmp.full.npy", base + ".full.npy")
+            elif os.path.exists(base + ".full.npy"):
+                # Dropped after PCA was fitted (no re-scoring)
+                os.remove(base + ".full.npy")
+            np.save(base + ".tmp.npy", matrix)
+            with open(base + ".tmp.json", "w", encoding="utf-8") as f:
+                json.dump({"namespace": name, "ids": ids, "metadata": metadata}, f, ensure_ascii=False)
+            os.replace(base + ".tmp.npy", base + ".npy")
+            os.replace(base + ".tmp.json", base + ".json")
+
+    def _load(self, namespace: str) -> Optional[NamespaceIndex]:
+        """Read one shard from disk, or None if it has never been saved"""
+        if not self.persist_dir:
+            return None
+        base = self._file_base(namespace)
+        if not os.path.exists(base + ".json"):
+            return None
+        try:
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+            matrix = np.load(base + ".npy")
+            full = np.load(base + ".full.npy") if os.path.exists(base + ".full.npy") else None
+            projection = Projection.load(base + ".proj.npz") if os.path.exists(base + ".proj.npz") else None
+        except Exception as e:
+            # Set the files aside: an empty shard takes their place and would be saved over them
+            quarantined = self._quarantine(base)
+            logger.error("Quarantined unreadable local index shard", extra={"path": base, "files": quarantined, "error": str(e)})
+            return None
+        ns = NamespaceIndex(self.dimension, self.reduction)
+        ns.restore(matrix, full, projection, data["ids"], data["metadata"])
+        if full is not None and ns.full is None:
+            # Left by a config that re-scored; nothing reads it now
+            os.remove(base + ".full.npy")
+        REGISTRY.inc("rag_index_shard_events_total", help="Local index shard hits / loads / evictions", event="load")
+        return ns
+
+    def _quarantine(self, base: str) -> List[str]:
+        """Rename a shard's files to *.corrupt-<time> so they are kept but no longer loaded or counted"""
+        suffix = f".corrupt-{int(time.time())}"
+        moved = []
+        for ext in (".npy", ".json", ".full.npy", ".proj.npz"):
+            if os.path.exists(base + ext):
+                os.replace(base + ext, base + ext + suffix)
+                moved.append(base + ext + suffix)
+        with self._lock:
+            self._cold_vectors = self._cold_shards = None  # re-seed without them
+        return moved
+
+    def _seed_cold(self):
+        """Scan shard file headers once for the evicted totals (caller holds _lock)"""
+        if self._cold_vectors is not None:
+            return
+        vectors = shards = 0
+        if self.persist_dir:
+            resident = {self._file_base(name) for name in self.namespaces}
+            for name in os.listdir(self.persist_dir):
+                if not name.endswith(".json") or name.endswith(".tmp.json"):
+                    continue
+                base = os.path.join(self.persist_dir, name[:-len(".json")])
+                rows = self._disk_rows(base) if base not in resident else None
+                if rows:
+                    vectors += rows
+                    shards += 1
+        self._cold_vectors, self._cold_shards = vectors, shards
+
+    @staticmethod
+    def _disk_rows(base: str) -> Optional[int]:
+        """Rows of a saved shard, from the .npy header only"""
+        try:
+            return int(np.load(base + ".npy", mmap_mode="r").shape[0])
+        except Exception:
+            return None
+
+    def _count_shard_files(self) -> int:
+        if not self.persist_dir:
+            return 0
+        return sum(1 for name in os.listdir(self.persist_dir) if name.endswith(".json") and not name.endswith(".tmp.json"))
+
+    def _remove_files(self, namespace: str):
+        if not self.persist_dir:
+            return
+        base = self._file_base(namespace)
+        for ext in (".npy", ".json", ".full.npy", ".proj.npz"):
+            if os.path.exists(base + ext):
+                os.remove(base + ext)
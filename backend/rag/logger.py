@@ -0,0 +1,69 @@
+"""
+Logging Module
+Leveled, structured (JSON by default) logging for the RAG pipeline
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg + any `extra` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Human-readable: `LEVEL logger: msg key=value ...`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        extras = " ".join(
+            f"{k}={v}" for k, v in record.__dict__.items() if k not in _RESERVED and not k.startswith("_")
+        )
+        line = f"{record.levelname:<7} {record.name}: {record.getMessage()}"
+        if extras:
+            line += f" {extras}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+_configured = False
+
+
+def configure_logging():
+    """Install the handler on the `rag` root logger once (LOG_LEVEL, LOG_FORMAT=json|text)"""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if os.getenv("LOG_FORMAT", "json").lower() == "json" else KeyValueFormatter())
+    root = logging.getLogger("rag")
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.propagate = False
+    _configured = True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the `rag` hierarchy, e.g. get_logger("loader") -> rag.loader"""
+    configure_logging()
+    return logging.getLogger(name if name.startswith("rag") else f"rag.{name}")
@@ -0,0 +1,210 @@
+"""
+Metrics Module
+Per-stage timing spans, histograms with p50/p95/p99, Prometheus text exposition
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .logger import get_logger
+from .profiling import current_profile
+
+logger = get_logger("metrics")
+
+# Seconds; covers a 1ms cache hit up to a 60s LLM timeout
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Items per call (embedding batch sizes, upsert sizes)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram plus a sliding window for quantiles
+
+    Buckets are what Prometheus aggregates across instances; the window
+    (last `window` observations) gives exact local p50/p95/p99.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...], window: int = 2048):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+            self.recent.append(value)
+
+    def quantiles(self) -> Dict[float, Optional[float]]:
+        with self._lock:
+            ordered = sorted(self.recent)
+        if not ordered:
+            return {q: None for q in QUANTILES}
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in QUANTILES}
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class MetricsRegistry:
+    """Labelled histograms/counters + pluggable collectors, rendered as Prometheus text"""
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: List[Callable[[], Dict[str, float]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = LATENCY_BUCKETS, help: str = "", **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = Histogram(buckets)
+                self._histograms[key] = hist
+                if help:
+                    self._help.setdefault(name, help)
+        hist.observe(value)
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def register_collector(self, collector: Callable[[], Dict[str, float]]):
+        """collector() -> {"metric_name{label=\\"x\\"}": value} gauges read at scrape time"""
+        self._collectors.append(collector)
+
+    def stage_summary(self) -> Dict[str, Dict]:
+        """p50/p95/p99 per stage span, for JSON status endpoints"""
+        out = {}
+        with self._lock:
+            items = [(k, h) for k, h in self._histograms.items() if k[0] == "rag_stage_duration_seconds"]
+        for (_, labels), hist in items:
+            stage = dict(labels).get("stage", "")
+            q = hist.quantiles()
+            out[stage] = {"count": hist.count, "p50": q[0.5], "p95": q[0.95], "p99": q[0.99]}
+        return out
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+            helps = dict(self._help)
+
+        seen = set()
+        for (name, labels), hist in histograms:
+            if name not in seen:
+                seen.add(name)
+                if name in helps:
+                    lines.append(f"# HELP {name} {helps[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            counts, total, n = hist.snapshot()
+            cumulative = 0
+            for bound, c in zip(list(hist.buckets) + ["+Inf"], counts):
+                cumulative += c
+                lines.append(f"{name}_bucket{_labels(labels + (('le', _fmt(bound)),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total}")
+            lines.append(f"{name}_count{_labels(labels)} {n}")
+
+        # Local quantiles as a separate gauge family per histogram (a histogram can't carry them)
+        seen = set()
+        for (name, labels), hist in histograms:
+            family = f"{name}_quantile"
+            if family not in seen:
+                seen.add(family)
+                lines.append(f"# TYPE {family} gauge")
+            for q, value in hist.quantiles().items():
+                if value is not None:
+                    lines.append(f"{family}{_labels(labels + (('quantile', str(q)),))} {value}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                if name in helps:
+                    lines.append(f"# HELP {name} {helps[name]}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+
+        for collector in self._collectors:
+            try:
+                for series, value in collector().items():
+                    if value is not None:
+                        lines.append(f"{series} {float(value)}")
+            except Exception as e:
+                logger.warning("Metrics collector failed", extra={"error": str(e)})
+
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(bound) -> str:
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+# Process-wide registry
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def span(stage: str, **fields) -> Iterator[Dict]:
+    """
+    Time a pipeline stage into rag_stage_duration_seconds{stage=...}
+
+    Yields a dict the caller can add fields to (e.g. batch size); they are
+    logged at DEBUG with the duration, and recorded in the request's
+    profile when it is being profiled.
+    """
+    info = dict(fields)
+    profile = current_profile()
+    if profile is not None:
+        profile.enter()
+    start = time.perf_counter()
+    error = None
+    try:
+        yield info
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        REGISTRY.observe(
+            "rag_stage_duration_seconds", elapsed,
+            help="Duration of RAG pipeline stages", stage=stage,
+        )
+        if error:
+            REGISTRY.inc("rag_stage_errors_total", help="Pipeline stage failures", stage=stage, error=error)
+        if profile is not None:
+            profile.exit(stage, start, elapsed, info, error)
+        logger.debug("span", extra={"stage": stage, "duration_ms": round(elapsed * 1000, 3), "error": error, **info})
+
+
+def observe_size(name: str, value: float, **labels):
+    """Record a size-like observation (batch size, vectors per upsert)"""
+    REGISTRY.observe(name, value, buckets=SIZE_BUCKETS, **labels)
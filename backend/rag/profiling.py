@@ -0,0 +1,244 @@
+"""
+Profiling Module
+Opt-in per-request stage traces and a sampling profiler armed for the next N requests
+
+Nothing here runs unless a request asks for it: span() checks one context
+variable, which is None for every unprofiled request.
+"""
+
+import contextvars
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger("profiling")
+
+# The RequestProfile of the request being served in this thread / task, if any
+_PROFILE: contextvars.ContextVar = contextvars.ContextVar("rag_profile", default=None)
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    return _PROFILE.get()
+
+
+class RequestProfile:
+    """
+    What is being collected for one request
+
+    trace: record every span (stage, offset, duration, fields) for a
+        breakdown returned with the response
+    sampler: the SamplingProfiler this request's threads are sampled by
+    """
+
+    def __init__(self, trace: bool = False, sampler: Optional["SamplingProfiler"] = None):
+        self.trace = trace
+        self.sampler = sampler
+        self.started = time.perf_counter()
+        self.spans: List[Dict] = []
+
+    def enter(self):
+        """A span starts in the calling thread"""
+        if self.sampler is not None:
+            self.sampler.attach(threading.get_ident())
+
+    def exit(self, stage: str, start: float, elapsed: float, fields: Dict, error: Optional[str]):
+        if self.sampler is not None:
+            self.sampler.detach(threading.get_ident())
+        if self.trace:
+            # list.append is atomic: spans may end on the speculative pool's threads
+            self.spans.append({
+                "stage": stage,
+                "start_ms": round((start - self.started) * 1000, 3),
+                "duration_ms": round(elapsed * 1000, 3),
+                "thread": threading.current_thread().name,
+                **({"error": error} if error else {}),
+                **{k: v for k, v in fields.items() if isinstance(v, (str, int, float, bool))},
+            })
+
+    def breakdown(self) -> Dict:
+        """Spans in start order plus per-stage totals"""
+        spans = sorted(self.spans, key=lambda s: s["start_ms"])
+        stages = {}
+        for s in spans:
+            entry = stages.setdefault(s["stage"], {"count": 0, "total_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] = round(entry["total_ms"] + s["duration_ms"], 3)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": stages,
+            "spans": spans,
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (shown by browser devtools)"""
+        stages = self.breakdown()["stages"]
+        parts = [f"{name};dur={s['total_ms']}" + (f';desc="x{s["count"]}"' if s["count"] > 1 else "") for name, s in stages.items()]
+        return ", ".join(parts)
+
+
+@contextmanager
+def profiling(profile: Optional[RequestProfile]):
+    """Make profile the current request's profile; the calling thread is sampled throughout"""
+    if profile is None:
+        yield
+        return
+    token = _PROFILE.set(profile)
+    profile.enter()
+    try:
+        yield
+    finally:
+        if profile.sampler is not None:
+            profile.sampler.detach(threading.get_ident())
+            profile.sampler.finish()
+        _PROFILE.reset(token)
+
+
+class SamplingProfiler:
+    """
+    Stack sampler for a bounded number of requests
+
+    arm(n) makes the next n claim() calls succeed. While a claimed request
+    runs, the threads doing its work (the request's worker thread, plus any
+    thread inside one of its spans) are registered; a background thread
+    reads their stacks every interval from sys._current_frames() and counts
+    identical stacks. The sampler thread exists only while armed or while
+    sampled requests are in flight.
+
+    Interview Note: Sampling, not tracing (sys.setprofile), so the sampled
+    requests run at nearly full speed and the call tree's weights are wall
+    time, including time blocked on Pinecone / the LLM. Output is the
+    collapsed-stack format flamegraph.pl and speedscope read, or a nested
+    {name, value, children} tree for d3-flame-graph.
+    """
+
+    def __init__(self):
+        self.remaining = 0
+        self.interval = 0.005
+        self.stacks: Dict[tuple, int] = {}
+        self.samples = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.armed_at = None
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def arm(self, requests: int, interval_ms: float = 5.0):
+        """Sample the next `requests` claimed requests; previous results are discarded"""
+        with self._lock:
+            self.remaining = requests
+            self.interval = max(interval_ms, 1.0) / 1000
+            self.stacks = {}
+            self.samples = 0
+            self.requests = 0
+            self.armed_at = time.time()
+            self._start()
+        logger.info("Sampling profiler armed", extra={"requests": requests, "interval_ms": interval_ms})
+
+    def claim(self) -> bool:
+        """True (and one request fewer to go) if the calling request should be sampled"""
+        if not self.remaining:
+            return False
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            self.requests += 1
+            self.in_flight += 1
+            return True
+
+    def finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def attach(self, thread_id: int):
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def detach(self, thread_id: int):
+        with self._lock:
+            count = self._threads.get(thread_id, 0) - 1
+            if count > 0:
+                self._threads[thread_id] = count
+            else:
+                self._threads.pop(thread_id, None)
+
+    # -------------------------------
+    # SAMPLING
+    # -------------------------------
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="rag-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if self.remaining <= 0 and self.in_flight <= 0:
+                    self._thread = None
+                    return
+                thread_ids = list(self._threads)
+            if not thread_ids:
+                continue
+            frames = sys._current_frames()
+            sampled = [self._stack(frames[t]) for t in thread_ids if t in frames]
+            with self._lock:
+                for stack in sampled:
+                    self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                    self.samples += 1
+
+    @staticmethod
+    def _stack(frame) -> tuple:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":"))
+            frame = frame.f_back
+        return tuple(reversed(names))
+
+    # -------------------------------
+    # OUTPUT
+    # -------------------------------
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "armed": self.remaining,
+                "in_flight": self.in_flight,
+                "requests_sampled": self.requests,
+                "samples": self.samples,
+                "interval_ms": round(self.interval * 1000, 3),
+                "armed_at": self.armed_at,
+            }
+
+    def collapsed(self) -> str:
+        """One "root;caller;callee count" line per distinct stack"""
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks)
+
+    def tree(self) -> Dict:
+        """Aggregated call tree: {"name", "value", "children": [...]}"""
+        root = {"name": "all", "value": 0, "children": {}}
+        with self._lock:
+            stacks = list(self.stacks.items())
+        for stack, count in stacks:
+            node = root
+            node["value"] += count
+            for name in stack:
+                node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+                node["value"] += count
+        return self._listify(root)
+
+    def _listify(self, node: Dict) -> Dict:
+        children = sorted(node["children"].values(), key=lambda c: -c["value"])
+        return {"name": node["name"], "value": node["value"], "children": [self._listify(c) for c in children]}
+
+
+# Process-wide sampler, armed through the admin endpoint
+SAMPLER = SamplingProfiler()
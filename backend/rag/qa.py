@@ -5,11 +5,23 @@ RAG Question Answering Module
 """
 
 from typing import Dict, List
+import contextvars
 import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
 
+from .llm_provider import get_llm, LLMUnavailable
+from .logger import get_logger
+from .metrics import span
+from .summarizer import referenced_page
+
+logger = get_logger("qa")
+
 load_dotenv()
 
+# Shared pool for speculative retrieval (QuestionAnswerer is created per request)
+_SPECULATIVE_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-speculative")
+
 
 class QuestionAnswerer:
     def __init__(
@@ -18,11 +30,27 @@ class QuestionAnswerer:
         chunks_data: List[Dict],
         top_k: int = 15,
         use_llm: bool = True,
+        reranker=None,
+        rerank_candidates: int = 20,
+        speculative_retrieval: bool = False,
+        condense_deadline: float = 1.5,
+        structured_engine=None,
+        summary: Dict = None,
     ):
         self.vector_store = vector_store
         self.chunks_data = chunks_data
         self.top_k = top_k
         self.use_llm = use_llm
+        # Optional cross-encoder: fetch a wider candidate set, keep the best top_k
+        self.reranker = reranker
+        self.rerank_candidates = max(rerank_candidates, top_k)
+        # Retrieve on the raw follow-up while condensing; condensed results merged if ready in time
+        self.speculative_retrieval = speculative_retrieval
+        self.condense_deadline = condense_deadline
+        # CSV uploads: aggregate/filter/sort questions answered from the typed table
+        self.structured_engine = structured_engine
+        # Ready ingest-time summary record, passed only for summary-style questions
+        self.summary = summary
 
         if self.use_llm:
             self._init_llm()
@@ -32,49 +60,49 @@ class QuestionAnswerer:
     # -------------------------------
     def _init_llm(self):
         try:
-            # Try OpenAI First (only if key starts with sk-)
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if openai_api_key and openai_api_key.startswith("sk-"):
-                from openai import OpenAI
-                self.client = OpenAI(api_key=openai_api_key)
-                self.llm_type = "openai"
-                print("OpenAI LLM initialized (gpt-3.5-turbo)")
+            # Pooled, deadline-bounded provider (OpenAI first, then Groq)
+            self.llm = get_llm()
+            if self.llm is not None:
+                self.llm_type = self.llm.name
                 return
 
-            # Check Groq Key
-            groq_api_key = os.getenv("GROQ_API_KEY") or (openai_api_key if openai_api_key and openai_api_key.startswith("gsk_") else None)
-            
-            if groq_api_key:
-                from langchain_groq import ChatGroq
-                self.llm = ChatGroq(
-                    groq_api_key=groq_api_key,
-                    model_name="llama-3.1-8b-instant", # Correct model name for Groq
-                    temperature=0.1,
-                    max_tokens=512,
-                )
-                self.llm_type = "groq"
-                print("Groq LLM initialized (llama-3.1-8b-instant) [V2 - Consolidated]")
-                return
-
-            print("No valid LLM keys found. LLM disabled.")
+            logger.warning("No valid LLM keys found. LLM disabled.")
             self.use_llm = False
 
         except Exception as e:
-            print(f"Failed to initialize LLM: {e}")
+            logger.error("Failed to initialize LLM", extra={"error": str(e)})
             self.use_llm = False
 
     # -------------------------------
     # MAIN Q&A PIPELINE
     # -------------------------------
     def answer_question(self, question: str, history: List[Dict] = [], tenant_id: str = "default") -> Dict:
-        # Step 0: Context Aware Query Condensing
-        search_query = question
-        if history and len(question.split()) < 5:
-            search_query = self._condense_question(question, history)
-            print(f"Condensed Query: {search_query}")
-
-        # Step 1: Vector search
-        scores, indices = self.vector_store.search(search_query, self.top_k, tenant_id=tenant_id)
+        needs_condense = bool(history) and len(question.split()) < 5
+
+        # Summary route: precomputed at ingest, no retrieval or LLM call
+        if self.summary is not None and not needs_condense:
+            return self._answer_from_summary(question)
+
+        # Structured route: exact column operations for tabular questions
+        if self.structured_engine is not None and not needs_condense:
+            try:
+                structured = self.structured_engine.answer(question)
+            except Exception as e:
+                logger.warning("Structured query failed, using retrieval", extra={"error": str(e)})
+                structured = None
+            if structured:
+                logger.info("Structured query", extra={"operation": structured["operation"], "row_count": structured["row_count"]})
+                return self._answer_from_table(question, structured)
+
+        # Step 0 + 1: Context Aware Query Condensing, then vector search (+ optional rerank)
+        if needs_condense and self.speculative_retrieval and self.use_llm:
+            scores, indices = self._speculative_retrieve(question, history, tenant_id)
+        else:
+            search_query = question
+            if needs_condense:
+                search_query = self._condense_question(question, history)
+                logger.debug("Condensed query", extra={"query": search_query})
+            scores, indices = self._retrieve(search_query, tenant_id)
 
         if not scores or len(indices) == 0:
             return self._no_data_response(0.0)
@@ -99,36 +127,131 @@ class QuestionAnswerer:
 
         confidence_score = max(scores)
 
-        # Step 3: Answer generation (LLM or Fallback)
-        is_fallback = False
+        # Step 3 & 4: Answer generation (LLM or Fallback) + formatting
+        return {
+            "answer": self._compose_answer(question, context_chunks),
+            "has_relevant_data": True,
+            "confidence_score": confidence_score,
+            "source_chunks": context_chunks,
+        }
+
+    def _compose_answer(self, question: str, context_chunks: List[Dict], fallback_answer: str = None) -> str:
+        """LLM answer, or the excerpt fallback (custom fallback_answer if given)"""
+        # A failing / timed-out / circuit-open provider goes straight to excerpts
         if self.use_llm:
-            if self.llm_type == "openai":
-                llm_answer = self._generate_openai_answer(question, context_chunks)
-            elif self.llm_type == "groq":
-                llm_answer = self._generate_llm_answer(question, context_chunks)
-            else:
-                llm_answer = self._generate_fallback_answer(context_chunks)
-                is_fallback = True
-        else:
-            llm_answer = self._generate_fallback_answer(context_chunks)
-            is_fallback = True
+            try:
+                with span("llm", provider=self.llm_type):
+                    if self.llm_type == "openai":
+                        return self._generate_openai_answer(question, context_chunks)
+                    return self._generate_llm_answer(question, context_chunks)
+            except LLMUnavailable as e:
+                logger.warning("LLM unavailable, using excerpts", extra={"error": str(e)})
+
+        if fallback_answer is not None:
+            return fallback_answer
+        return "### Relevant Excerpts Found\n\n" + self._generate_fallback_answer(context_chunks)
 
-        # Step 4: Format the final response
-        # Structure: Natural Answer ONLY (Metadata handled separately by frontend)
-        
-        if is_fallback:
-            final_answer = "### Relevant Excerpts Found\n\n" + llm_answer
-        else:
-            # Clean conversational answer
-            final_answer = llm_answer
+    # -------------------------------
+    # STRUCTURED (CSV TABLE) ANSWERING
+    # -------------------------------
+    def _answer_from_table(self, question: str, structured: Dict) -> Dict:
+        """Exact answer from column operations; only the small result reaches the LLM"""
+        confidence = structured.get("confidence", 1.0)
+        context_chunks = [{
+            "text": structured["text"],
+            "page": 0,
+            "score": confidence,
+            "operation": structured["operation"],
+        }]
+        # Excerpt preview would truncate the result; without an LLM show it whole
+        answer = self._compose_answer(
+            question, context_chunks, fallback_answer="### Query Result\n\n" + structured["text"]
+        )
 
         return {
-            "answer": final_answer,
+            "answer": answer,
             "has_relevant_data": True,
-            "confidence_score": confidence_score,
+            "confidence_score": confidence,
             "source_chunks": context_chunks,
         }
 
+    # -------------------------------
+    # SUMMARY ANSWERING
+    # -------------------------------
+    def _answer_from_summary(self, question: str) -> Dict:
+        """Document summary, or the section summary covering a page the question names"""
+        sections = self.summary["sections"]
+        page = referenced_page(question)
+        section = next((s for s in sections if page is not None and s["pages"][0] <= page <= s["pages"][1]), None)
+
+        answer = section["summary"] if section else self.summary["summary"]
+        if self.summary["method"] != "llm":
+            answer = "### Document Overview\n\n" + answer
+        logger.info("Answered from summary", extra={"section": section["pages"] if section else None})
+
+        return {
+            "answer": answer.replace("_", " "),
+            "has_relevant_data": True,
+            "confidence_score": 1.0,
+            "source_chunks": [
+                {"text": s["summary"], "page": s["pages"][0], "score": 1.0, "pages": s["pages"]}
+                for s in ([section] if section else sections)
+            ],
+        }
+
+    # -------------------------------
+    # RETRIEVAL (+ OPTIONAL RERANK)
+    # -------------------------------
+    def _retrieve(self, search_query: str, tenant_id: str):
+        if self.reranker is None:
+            return self.vector_store.search(search_query, self.top_k, tenant_id=tenant_id)
+
+        scores, results = self.vector_store.search(search_query, self.rerank_candidates, tenant_id=tenant_id)
+        try:
+            with span("rerank", candidates=len(results)):
+                return self.reranker.rerank(search_query, scores, results, top_k=self.top_k)
+        except Exception as e:
+            logger.warning("Rerank failed, using vector scores", extra={"error": str(e)})
+            return scores[:self.top_k], results[:self.top_k]
+
+    def _speculative_retrieve(self, question: str, history: List[Dict], tenant_id: str):
+        """
+        Run retrieval on the raw follow-up concurrently with condensing.
+        If the condensed query arrives within condense_deadline seconds it is
+        searched too and both result sets are merged; otherwise the raw-query
+        results are used as-is.
+        """
+        # copy_context: the pool threads keep the request's scheduler tenant / lane
+        raw_future = _SPECULATIVE_POOL.submit(contextvars.copy_context().run, self._retrieve, question, tenant_id)
+        condense_future = _SPECULATIVE_POOL.submit(contextvars.copy_context().run, self._condense_question, question, history)
+
+        try:
+            search_query = condense_future.result(timeout=self.condense_deadline)
+        except FutureTimeoutError:
+            logger.info("Condense exceeded deadline, using raw-query results", extra={"deadline_s": self.condense_deadline})
+            return raw_future.result()
+        except Exception:
+            return raw_future.result()
+
+        logger.debug("Condensed query", extra={"query": search_query})
+        if not search_query or search_query.strip().lower() == question.strip().lower():
+            return raw_future.result()
+
+        condensed = self._retrieve(search_query, tenant_id)
+        return self._merge_results(condensed, raw_future.result())
+
+    def _merge_results(self, *result_sets):
+        """Union of (scores, results) sets, de-duplicated by id/text, best score kept"""
+        best = {}
+        for scores, results in result_sets:
+            for score, item in zip(scores, results):
+                key = item.get("id") or item.get("text", "") if isinstance(item, dict) else item
+                if key not in best or score > best[key][0]:
+                    best[key] = (score, item)
+
+        ranked = sorted(best.values(), key=lambda pair: pair[0], reverse=True)[:self.top_k]
+        return [p[0] for p in ranked], [p[1] for p in ranked]
+
     def _summarize_user_question(self, question: str) -> str:
         """Generates a concise summary of the user's question."""
         if not self.use_llm:
@@ -137,22 +260,10 @@ class QuestionAnswerer:
         prompt = f"Summarize what the user is asking in one short, professional sentence (starting with 'You are asking about...'):\n\nQuestion: {question}"
         
         try:
-            if self.llm_type == "openai":
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0,
-                    max_tokens=50
-                )
-                return response.choices[0].message.content.strip()
-            elif self.llm_type == "groq":
-                response = self.llm.invoke([{"role": "user", "content": prompt}])
-                return response.content.strip()
-        except Exception as e:
-            print(f"Summary generation failed: {e}")
+            return self.llm.complete([{"role": "user", "content": prompt}], temperature=0, max_tokens=50).strip()
+        except LLMUnavailable as e:
+            logger.warning("Summary generation failed", extra={"error": str(e)})
             return f"You are asking about: {question}"
-        
-        return f"You are asking about: {question}"
 
     # -------------------------------
     # QUERY CONDENSING (MEMORY)
@@ -175,21 +286,10 @@ Follow-up: {question}
 Standalone Query:"""
 
         try:
-            if self.llm_type == "openai":
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0,
-                    max_tokens=50
-                )
-                return response.choices[0].message.content.strip()
-            elif self.llm_type == "groq":
-                response = self.llm.invoke([{"role": "user", "content": prompt}])
-                return response.content.strip()
-        except Exception as e:
+            with span("condense"):
+                return self.llm.complete([{"role": "user", "content": prompt}], temperature=0, max_tokens=50).strip()
+        except LLMUnavailable:
             return question
-        
-        return question
 
     # -------------------------------
     # OPENAI ANSWER GENERATION
@@ -201,30 +301,26 @@ Standalone Query:"""
             [chunk['text'] for chunk in context_chunks]
         ).replace("_", " ")
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a helpful and professional document-based assistant. "
-                            "CONSOLIDATE the information from the provided context into a coherent, "
-                            "easy-to-read answer. Summarize the key points like ChatGPT would. "
-                            "NEVER include page numbers, citations, brackets like [Page X], or technical field names like 'Product_ID' in your response. "
-                            "NEVER include underscores (_) in your response; convert technical keys like 'Total_Height' into natural spaces like 'Total Height'."
-                        ).replace("_", " ")
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Context:\n{context_text}\n\nQuestion: {question}\n\nConsolidated Answer:"
-                    }
-                ],
-                temperature=0.3, # Slightly higher for better flow
-            ).choices[0].message.content
-            return response.replace("_", " ")
-        except Exception as e:
-            return self._generate_fallback_answer(context_chunks).replace("_", " ")
+        response = self.llm.complete(
+            [
+                {
+                    "role": "system",
+                    "content": (
+                        "You are a helpful and professional document-based assistant. "
+                        "CONSOLIDATE the information from the provided context into a coherent, "
+                        "easy-to-read answer. Summarize the key points like ChatGPT would. "
+                        "NEVER include page numbers, citations, brackets like [Page X], or technical field names like 'Product_ID' in your response. "
+                        "NEVER include underscores (_) in your response; convert technical keys like 'Total_Height' into natural spaces like 'Total Height'."
+                    ).replace("_", " ")
+                },
+                {
+                    "role": "user",
+                    "content": f"Context:\n{context_text}\n\nQuestion: {question}\n\nConsolidated Answer:"
+                }
+            ],
+            temperature=0.3, # Slightly higher for better flow
+        )
+        return response.replace("_", " ")
 
     # -------------------------------
     # GROQ ANSWER GENERATION
@@ -251,18 +347,14 @@ Standalone Query:"""
 
         user_prompt = f"Context:\n{context_text}\n\nQuestion: {question}\n\nAnswer:"
 
-        try:
-            response = self.llm.invoke(
-                [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ]
-            )
-            return response.content.replace("_", " ")
-
-        except Exception as e:
-            print(f"Groq LLM error: {e}")
-            return self._generate_fallback_answer(context_chunks)
+        response = self.llm.complete(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            temperature=None, # Keep the client's configured temperature
+        )
+        return response.replace("_", " ")
 
     # -------------------------------
     # FALLBACK (NO LLM)
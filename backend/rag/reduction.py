@@ -0,0 +1,96 @@
+"""
+Dimensionality Reduction Module
+Per-namespace projections that shrink embeddings before they are indexed:
+PCA fitted on the namespace's own vectors, or prefix truncation for
+Matryoshka-style models whose leading dimensions carry most of the signal
+"""
+
+import numpy as np
+from typing import Optional
+
+# Rows used to fit PCA; more adds fitting time, not accuracy
+PCA_FIT_SAMPLE = 20000
+
+
+class ReductionConfig:
+    """
+    How a LocalVectorIndex reduces its namespaces
+
+    dim: target dimension (0 = off)
+    method: "pca" or "prefix"
+    min_vectors: PCA is fitted once a namespace holds this many vectors;
+        smaller namespaces are searched at full width
+    rescore: if > 0, the top top_k * rescore reduced-space candidates are
+        re-scored against the full-width vectors
+    """
+
+    def __init__(self, dim: int = 0, method: str = "pca", min_vectors: int = 1000, rescore: int = 0):
+        if method not in ("pca", "prefix"):
+            raise ValueError(f"Unknown reduction method: {method}")
+        self.dim = dim
+        self.method = method
+        self.min_vectors = min_vectors
+        self.rescore = rescore
+
+    @property
+    def enabled(self) -> bool:
+        return self.dim > 0
+
+    def keep_full(self, fitted: bool = False) -> bool:
+        """Full-width rows are needed to re-score, and for PCA only until it is fitted"""
+        return self.enabled and (self.rescore > 0 or (self.method == "pca" and not fitted))
+
+
+class Projection:
+    """
+    Linear map from full-width (L2-normalised) embeddings to `dim` dimensions
+
+    Interview Note: PCA uses the uncentred second moment (SVD of the raw
+    rows), so dot products in the reduced space approximate the original
+    cosine scores rather than scores around the mean. Prefix truncation
+    re-normalises, as Matryoshka-trained models expect.
+    """
+
+    def __init__(self, method: str, dim: int, components: Optional[np.ndarray] = None, explained: float = 1.0):
+        self.method = method
+        self.dim = dim
+        # (full_dim, dim) for PCA, None for prefix
+        self.components = components
+        self.explained = explained
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dim: int, seed: int = 0) -> "Projection":
+        x = np.asarray(vectors, dtype=np.float32)
+        if len(x) > PCA_FIT_SAMPLE:
+            x = x[np.random.default_rng(seed).choice(len(x), PCA_FIT_SAMPLE, replace=False)]
+        # Eigenvectors of X^T X (d x d) are cheaper than an SVD of X for n >> d
+        gram = (x.T @ x).astype(np.float64)
+        eigenvalues, eigenvectors = np.linalg.eigh(gram)
+        order = np.argsort(eigenvalues)[::-1][:dim]
+        total = float(eigenvalues.sum())
+        explained = float(eigenvalues[order].sum() / total) if total > 0 else 1.0
+        return cls("pca", dim, np.ascontiguousarray(eigenvectors[:, order], dtype=np.float32), explained)
+
+    @classmethod
+    def prefix(cls, dim: int) -> "Projection":
+        return cls("prefix", dim)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        x = np.asarray(vectors, dtype=np.float32)
+        if self.method == "prefix":
+            x = x[..., :self.dim]
+            return x / np.maximum(np.linalg.norm(x, axis=-1, keepdims=True), 1e-12)
+        return x @ self.components
+
+    def save(self, path: str):
+        arrays = {"method": np.array(self.method), "dim": np.array(self.dim), "explained": np.array(self.explained)}
+        if self.components is not None:
+            arrays["components"] = self.components
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path, allow_pickle=False) as data:
+            components = data["components"] if "components" in data else None
+            return cls(str(data["method"]), int(data["dim"]), components, float(data["explained"]))
@@ -0,0 +1,134 @@
+"""
+Reranker Module
+Cross-encoder reranking of retrieved chunks (CPU, batched, cached)
+"""
+
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional
+
+from .logger import get_logger
+
+logger = get_logger("reranker")
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores (query, chunk) pairs with a small cross-encoder.
+
+    Interview Note: Bi-encoder cosine scores are cheap but coarse. Fetching a
+    wider candidate set and re-scoring it with a cross-encoder lets us send
+    fewer, better chunks to the LLM. All uncached pairs are scored in a single
+    batched predict() call, and scores are cached per (query, chunk id).
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        cache_size: int = 10000,
+        max_length: int = 512,
+    ):
+        """
+        Initialize reranker
+
+        Args:
+            model_name: HuggingFace cross-encoder model
+            batch_size: Pairs per forward pass inside the single predict() call
+            cache_size: Max number of cached (query, chunk id) scores
+            max_length: Token limit per (query, chunk) pair
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+
+        # Lazy import to keep startup light when reranking is disabled
+        from sentence_transformers import CrossEncoder
+        logger.info("Loading cross-encoder reranker", extra={"model": model_name})
+        self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+
+        # Shared by concurrent /ask requests on the threadpool
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def rerank(
+        self,
+        query: str,
+        scores: List[float],
+        results: List[Dict],
+        top_k: int = 3,
+    ) -> Tuple[List[float], List[Dict]]:
+        """
+        Rerank search results and keep the best top_k
+
+        Args:
+            query: Search query the candidates were retrieved for
+            scores: Vector similarity scores from VectorStore.search
+            results: Result dicts from VectorStore.search
+            top_k: Number of results to keep
+
+        Returns:
+            (scores, results) in the same shape as VectorStore.search, where
+            scores are sigmoid-normalised cross-encoder scores in [0, 1]
+        """
+        if not results:
+            return scores, results
+
+        keys = [(query, self._chunk_key(item)) for item in results]
+        rerank_scores: List[Optional[float]] = [self._cache_get(k) for k in keys]
+
+        missing = [i for i, s in enumerate(rerank_scores) if s is None]
+        if missing:
+            pairs = [(query, results[i].get("text", "")) for i in missing]
+            logits = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            for i, logit in zip(missing, logits):
+                score = self._sigmoid(float(logit))
+                rerank_scores[i] = score
+                self._cache_put(keys[i], score)
+
+        order = sorted(range(len(results)), key=lambda i: rerank_scores[i], reverse=True)[:top_k]
+
+        new_scores = []
+        new_results = []
+        for i in order:
+            item = dict(results[i])
+            item["vector_score"] = float(scores[i]) if i < len(scores) else 0.0
+            new_scores.append(rerank_scores[i])
+            new_results.append(item)
+
+        return new_scores, new_results
+
+    def _chunk_key(self, item: Dict) -> str:
+        """Stable chunk identifier: vector id when present, else a text hash"""
+        chunk_id = item.get("id")
+        if chunk_id:
+            return str(chunk_id)
+        return hashlib.sha1(item.get("text", "").encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._cache_lock:
+            score = self._cache.get(key)
+            if score is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return score
+
+    def _cache_put(self, key: Tuple[str, str], score: float):
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _sigmoid(x: float) -> float:
+        if x >= 0:
+            return 1.0 / (1.0 + math.exp(-x))
+        z = math.exp(x)
+        return z / (1.0 + z)
@@ -0,0 +1,394 @@
+"""
+Structured Query Module
+Typed columnar tables for CSV uploads + vectorized aggregate/filter/sort answering
+"""
+
+import csv
+import os
+import re
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+
+from .logger import get_logger
+
+logger = get_logger("structured")
+
+
+class ColumnTable:
+    """
+    Typed, column-oriented copy of a CSV
+
+    Interview Note: Top-k similarity over row text can't answer "most
+    expensive" or "how many" — those need every row. Keeping each column as
+    one numpy array (float64 for numeric columns, unicode for the rest) makes
+    max/min/count/filter/group single vectorized operations.
+    """
+
+    NUMERIC_RATIO = 0.9  # share of non-empty cells that must parse as numbers
+
+    def __init__(self, columns: Dict[str, np.ndarray], order: List[str]):
+        self.columns = columns
+        self.order = order
+        self.n_rows = len(columns[order[0]]) if order else 0
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> "ColumnTable":
+        """Parse a CSV into typed columns"""
+        with open(csv_path, "r", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            raw = [[] for _ in header]
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                for i in range(len(header)):
+                    raw[i].append(row[i].strip() if i < len(row) else "")
+
+        columns = {}
+        order = []
+        for name, values in zip(header, raw):
+            name = name.strip()
+            if not name or name in columns:
+                continue
+            columns[name] = cls._type_column(values)
+            order.append(name)
+
+        logger.info("Loaded CSV table", extra={"columns": len(order), "rows": len(raw[0]) if raw else 0})
+        return cls(columns, order)
+
+    @classmethod
+    def _type_column(cls, values: List[str]) -> np.ndarray:
+        parsed = np.array([cls._parse_number(v) for v in values], dtype=np.float64)
+        non_empty = sum(1 for v in values if v)
+        if non_empty and np.count_nonzero(~np.isnan(parsed)) >= cls.NUMERIC_RATIO * non_empty:
+            return parsed
+        return np.array(values, dtype=np.str_)
+
+    @staticmethod
+    def _parse_number(value: str) -> float:
+        cleaned = value.replace(",", "").replace("$", "").replace("%", "").strip()
+        try:
+            return float(cleaned)
+        except ValueError:
+            return np.nan
+
+    def is_numeric(self, name: str) -> bool:
+        return self.columns[name].dtype == np.float64
+
+    def save(self, path: str):
+        """Persist as a compressed .npz (no pickled objects)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {f"col_{i}": self.columns[name] for i, name in enumerate(self.order)}
+        np.savez_compressed(path, __order__=np.array(self.order, dtype=np.str_), **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "ColumnTable":
+        with np.load(path, allow_pickle=False) as data:
+            order = [str(n) for n in data["__order__"]]
+            columns = {name: data[f"col_{i}"] for i, name in enumerate(order)}
+        return cls(columns, order)
+
+    def format_rows(self, indices: np.ndarray, limit: int) -> List[str]:
+        """Render rows like CSVLoader does ("key: value | ...")"""
+        lines = []
+        for idx in indices[:limit]:
+            parts = []
+            for name in self.order:
+                value = self.columns[name][idx]
+                if self.is_numeric(name):
+                    if np.isnan(value):
+                        continue
+                    value = f"{value:g}"
+                elif not value:
+                    continue
+                parts.append(f"{name}: {value}")
+            lines.append(" | ".join(parts))
+        return lines
+
+
+class StructuredQueryEngine:
+    """
+    Routes simple aggregate / filter / sort questions to column operations
+
+    Returns None for anything it doesn't confidently understand, so the caller
+    can fall back to normal retrieval. A question is only taken when it names
+    a column or a value that occurs in the table; operation words alone
+    ("how many years of warranty ...") are prose, not table queries.
+    """
+
+    MAX_RESULT_ROWS = 50
+    MAX_CATEGORY_VALUES = 200
+
+    PRICE_HINTS = ("price", "cost", "amount", "mrp", "rate")
+    NAME_HINTS = ("name", "product", "title", "item", "label", "model")
+
+    OP_PATTERNS = [
+        ("count", r"\b(how many|count|number of)\b"),
+        ("mean", r"\b(average|avg|mean)\b"),
+        ("sum", r"\b(sum of|total)\b"),
+        ("max", r"\b(most expensive|priciest|highest|largest|biggest|maximum|max|heaviest)\b"),
+        ("min", r"\b(cheapest|least expensive|lowest|smallest|minimum|min|lightest)\b"),
+        ("list", r"^\s*(list|give me a list of)\b|\b(list all|show all|display all|show me all)\b"),
+    ]
+    # Words that refer to the table itself ("how many rows ...")
+    TABLE_WORDS = r"\b(rows|records|entries)\b"
+    # "most" / "least" only count when a numeric column follows ("most stock")
+    MOST_LEAST = r"\b(most|least|fewest)\s+([a-z0-9 _\-]+)"
+
+    # Thresholds: "at least" / "at most" include the number, "over" / "under" don't
+    BELOW = r"(at most|up to|no more than|<=|under|below|(?<!no )less than|cheaper than|<)\s*"
+    ABOVE = r"(at least|no less than|>=|over|above|(?<!no )more than|greater than|>)\s*"
+    INCLUSIVE = ("at most", "up to", "no more than", "<=", "at least", "no less than", ">=")
+
+    # Confidence by how the question refers to the table
+    STRONG_CONFIDENCE = 1.0  # a full column name, or a value stored in the table
+    WEAK_CONFIDENCE = 0.6    # part of a column name, "rows", or a price word mapped to a price column
+
+    def __init__(self, table: ColumnTable):
+        self.table = table
+
+    def answer(self, question: str) -> Optional[Dict]:
+        """
+        Try to answer from the table
+
+        Returns:
+            {"operation": str, "text": str, "row_count": int, "confidence": float} or None
+        """
+        if self.table.n_rows == 0:
+            return None
+        q = question.lower()
+        result = self._answer(q)
+        if result is not None:
+            result["confidence"] = self.STRONG_CONFIDENCE if self._strong_match(q) else self.WEAK_CONFIDENCE
+        return result
+
+    def _answer(self, q: str) -> Optional[Dict]:
+        table = self.table
+        op = next((name for name, pattern in self.OP_PATTERNS if re.search(pattern, q)), None)
+        mentioned = self._mentioned_columns(q)
+        numeric_target = next((c for c in mentioned if table.is_numeric(c)), None)
+        if op is None:
+            op, numeric_target = self._most_least(q, numeric_target)
+            if op is None:
+                return None
+
+        price_words = re.search(r"expensive|cheap|pric|cost", q)
+        if numeric_target is None and (price_words or re.search(r"under|below|over|above|less than|more than|at least|at most|up to|between|\$", q)):
+            numeric_target = self._find_column(self.PRICE_HINTS, numeric=True)
+
+        # Nothing in the question refers to this table: leave it to retrieval
+        referenced = mentioned or self._value_mentioned(q) or self._partial_columns(q) or re.search(self.TABLE_WORDS, q)
+        if not (referenced or (price_words and self._price_column())):
+            return None
+
+        mask, filters = self._build_filters(q, numeric_target)
+        group_col = self._group_column(q)
+
+        if op in ("max", "min"):
+            if numeric_target is None:
+                return None
+            top_n = self._top_n(q)
+            return self._extreme(numeric_target, mask, filters, op, top_n)
+
+        if op in ("mean", "sum"):
+            if numeric_target is None:
+                return None
+            if group_col:
+                return self._grouped(group_col, numeric_target, mask, filters, op)
+            values = table.columns[numeric_target][mask]
+            values = values[~np.isnan(values)]
+            if values.size == 0:
+                return None
+            value = float(values.mean() if op == "mean" else values.sum())
+            text = f"{'Average' if op == 'mean' else 'Total'} {numeric_target}{filters}: {value:g} (over {values.size} rows)"
+            return {"operation": op, "text": text, "row_count": int(values.size)}
+
+        if op == "count":
+            if group_col:
+                return self._grouped(group_col, None, mask, filters, "count")
+            count = int(np.count_nonzero(mask))
+            return {"operation": "count", "text": f"Number of rows{filters}: {count} (of {table.n_rows})", "row_count": count}
+
+        # list
+        indices = np.flatnonzero(mask)
+        if filters or len(indices) <= self.MAX_RESULT_ROWS:
+            rows = table.format_rows(indices, self.MAX_RESULT_ROWS)
+        else:
+            name_col = self._find_column(self.NAME_HINTS, numeric=False)
+            if name_col is None:
+                return None
+            names = table.columns[name_col][indices]
+            rows = [f"{name_col}: {n}" for n in names[:self.MAX_RESULT_ROWS * 4] if n]
+        header = f"{len(indices)} rows{filters}"
+        if len(indices) > len(rows):
+            header += f" (showing {len(rows)})"
+        return {"operation": "list", "text": header + ":\n" + "\n".join(rows), "row_count": int(len(indices))}
+
+    # -------------------------------
+    # OPERATIONS
+    # -------------------------------
+    def _extreme(self, column: str, mask: np.ndarray, filters: str, op: str, top_n: int) -> Optional[Dict]:
+        values = np.where(mask, self.table.columns[column], np.nan)
+        valid = np.count_nonzero(~np.isnan(values))
+        if valid == 0:
+            return None
+        n = min(top_n, valid)
+        keyed = -values if op == "max" else values
+        keyed = np.where(np.isnan(keyed), np.inf, keyed)
+        if n == 1:
+            order = np.array([int(np.argmin(keyed))])
+        else:
+            part = np.argpartition(keyed, n - 1)[:n]
+            order = part[np.argsort(keyed[part], kind="stable")]
+        label = "Highest" if op == "max" else "Lowest"
+        rows = self.table.format_rows(order, n)
+        text = f"{label} {column}{filters} (top {n} of {valid}):\n" + "\n".join(rows)
+        return {"operation": op, "text": text, "row_count": n}
+
+    def _grouped(self, group_col: str, value_col: Optional[str], mask: np.ndarray, filters: str, op: str) -> Dict:
+        keys = self.table.columns[group_col][mask]
+        uniques, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        if op == "count":
+            stats = counts.astype(np.float64)
+            label = "Count"
+        else:
+            values = self.table.columns[value_col][mask]
+            valid = ~np.isnan(values)
+            sums = np.bincount(inverse[valid], weights=values[valid], minlength=len(uniques))
+            if op == "sum":
+                stats, label = sums, f"Total {value_col}"
+            else:
+                n = np.bincount(inverse[valid], minlength=len(uniques))
+                stats = np.divide(sums, n, out=np.full(len(uniques), np.nan), where=n > 0)
+                label = f"Average {value_col}"
+        order = np.argsort(-np.nan_to_num(stats, nan=-np.inf), kind="stable")[:self.MAX_RESULT_ROWS]
+        rows = [f"{group_col}: {uniques[i]} | {label}: {stats[i]:g}" for i in order]
+        text = f"{label} by {group_col}{filters} ({len(uniques)} groups):\n" + "\n".join(rows)
+        return {"operation": f"group_{op}", "text": text, "row_count": int(len(uniques))}
+
+    # -------------------------------
+    # QUESTION PARSING
+    # -------------------------------
+    @staticmethod
+    def _normalize(name: str) -> str:
+        return re.sub(r"[_\-]+", " ", name).strip().lower()
+
+    def _strong_match(self, q: str) -> bool:
+        return bool(self._mentioned_columns(q) or self._value_mentioned(q))
+
+    def _most_least(self, q: str, numeric_target: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """("max" | "min", column) for "most <numeric column>" / "least <numeric column>" """
+        match = re.search(self.MOST_LEAST, q)
+        if not match:
+            return None, numeric_target
+        for name in self.table.order:
+            if self.table.is_numeric(name) and match.group(2).startswith(self._normalize(name).rstrip("s")):
+                return ("max" if match.group(1) == "most" else "min"), name
+        return None, numeric_target
+
+    def _partial_columns(self, q: str) -> List[str]:
+        """Columns with a word of their name (4+ letters) in the question: "products" for Product_ID"""
+        found = []
+        for name in self.table.order:
+            words = [w for w in self._normalize(name).split() if len(w) >= 4]
+            if any(re.search(r"\b" + re.escape(w.rstrip("s")) + r"s?\b", q) for w in words):
+                found.append(name)
+        return found
+
+    def _price_column(self) -> Optional[str]:
+        return next(
+            (n for n in self.table.order if self.table.is_numeric(n) and any(h in n.lower() for h in self.PRICE_HINTS)),
+            None,
+        )
+
+    def _value_mentioned(self, q: str) -> bool:
+        """A low-cardinality text value of the table (a category, a brand, ...) appears in the question"""
+        return bool(self._category_hits(q))
+
+    def _category_hits(self, q: str) -> Dict[str, List[str]]:
+        hits = {}
+        for name in self.table.order:
+            if self.table.is_numeric(name):
+                continue
+            column = self.table.columns[name]
+            uniques = np.unique(np.char.lower(column))
+            if len(uniques) > self.MAX_CATEGORY_VALUES or len(uniques) == self.table.n_rows:
+                continue
+            matched = [
+                u for u in uniques
+                if len(u) >= 3 and re.search(r"\b" + re.escape(u.rstrip("s")) + r"s?\b", q)
+            ]
+            if matched:
+                hits[name] = matched
+        return hits
+
+    def _mentioned_columns(self, q: str) -> List[str]:
+        found = []
+        for name in self.table.order:
+            norm = self._normalize(name)
+            if norm and re.search(r"\b" + re.escape(norm) + r"s?\b", q):
+                found.append(name)
+        # Longer (more specific) names first
+        return sorted(found, key=lambda n: len(n), reverse=True)
+
+    def _find_column(self, hints: Tuple[str, ...], numeric: bool) -> Optional[str]:
+        for hint in hints:
+            for name in self.table.order:
+                if hint in name.lower() and self.table.is_numeric(name) == numeric:
+                    return name
+        # No hinted column: first column of the requested type
+        return next((n for n in self.table.order if self.table.is_numeric(n) == numeric), None)
+
+    def _group_column(self, q: str) -> Optional[str]:
+        match = re.search(r"\b(?:by|per|for each|each)\s+([a-z0-9 _\-]+)", q)
+        if not match:
+            return None
+        phrase = match.group(1)
+        for name in self.table.order:
+            norm = self._normalize(name)
+            if not self.table.is_numeric(name) and phrase.startswith(norm.rstrip("s")):
+                return name
+        return None
+
+    @staticmethod
+    def _top_n(q: str) -> int:
+        match = re.search(r"\btop\s+(\d+)\b|\b(\d+)\s+(?:most|least|highest|lowest|cheapest)\b", q)
+        if match:
+            return max(1, min(int(match.group(1) or match.group(2)), StructuredQueryEngine.MAX_RESULT_ROWS))
+        return 1
+
+    def _build_filters(self, q: str, numeric_target: Optional[str]) -> Tuple[np.ndarray, str]:
+        table = self.table
+        mask = np.ones(table.n_rows, dtype=bool)
+        described = []
+
+        # Numeric thresholds on the target column
+        if numeric_target is not None:
+            values = table.columns[numeric_target]
+            number = r"\$?\s*([\d][\d,]*\.?\d*)"
+            between = re.search(r"between\s+" + number + r"\s+and\s+" + number, q)
+            if between:
+                lo, hi = (float(g.replace(",", "")) for g in between.groups())
+                mask &= (values >= lo) & (values <= hi)
+                described.append(f"{numeric_target} between {lo:g} and {hi:g}")
+            else:
+                below = re.search(self.BELOW + number, q)
+                above = re.search(self.ABOVE + number, q)
+                if below:
+                    limit = float(below.group(2).replace(",", ""))
+                    inclusive = below.group(1) in self.INCLUSIVE
+                    mask &= values <= limit if inclusive else values < limit
+                    described.append(f"{numeric_target} {'<=' if inclusive else '<'} {limit:g}")
+                if above:
+                    limit = float(above.group(2).replace(",", ""))
+                    inclusive = above.group(1) in self.INCLUSIVE
+                    mask &= values >= limit if inclusive else values > limit
+                    described.append(f"{numeric_target} {'>=' if inclusive else '>'} {limit:g}")
+
+        # Categorical equality: any low-cardinality value spelled out in the question
+        for name, hits in self._category_hits(q).items():
+            mask &= np.isin(np.char.lower(table.columns[name]), hits)
+            described.append(f"{name} in {', '.join(hits)}")
+
+        filters = f" where {' and '.join(described)}" if described else ""
+        return mask, filters
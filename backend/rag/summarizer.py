@@ -0,0 +1,192 @@
+"""
+Summarizer Module
+Hierarchical document summaries built at ingest time: page-group summaries
+in parallel, merged level by level into one document summary, plus
+suggested questions drawn from it
+"""
+
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .llm_provider import LLMUnavailable
+from .logger import get_logger
+from .metrics import span
+from .scheduler import Overloaded
+
+logger = get_logger("summarizer")
+
+# Page-group / merge calls of all summary jobs; the LLM scheduler bounds the real concurrency
+_SUMMARY_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-summary")
+
+# Whole-document requests only: "Summarize this document", "key takeaways", "overview of page 3",
+# "what is this report about". Anything with a subject of its own ("summarize the refund policy",
+# "the gist of clause 4") is a retrieval question.
+_OVERVIEW_NOUNS = r"(?:summary|overview|tl;?\s?dr|gist|synopsis|(?:key|main) (?:takeaways?|points|ideas|topics|findings)|takeaways|highlights)"
+_DOCUMENT_WORDS = r"(?:document|doc|file|pdf|report|paper|upload|it|this|that)"
+_SUMMARY_QUESTION = re.compile(
+    r"^(?:(?:please|can you|could you|would you|kindly)\s+)*"
+    r"(?:"
+    r"summar(?:ize|ise)"
+    r"|(?:give|show|provide|write|tell)(?:\s+(?:me|us))?(?:\s+(?:a|an|the))?(?:\s+(?:short|brief|quick))?\s+" + _OVERVIEW_NOUNS +
+    r"|(?:a|an|the)?\s*(?:short\s+|brief\s+|quick\s+)?" + _OVERVIEW_NOUNS +
+    r"|what(?:'s|\s+is|\s+are)\s+(?:the\s+)?" + _OVERVIEW_NOUNS +
+    r"|what(?:'s|\s+is)\s+(?:this|the)\s+" + _DOCUMENT_WORDS + r"\s+about"
+    r")"
+    r"(?:\s+(?:of|for|on|from|in))?(?:\s+(?:this|the|that|my|our))?(?:\s+" + _DOCUMENT_WORDS + r")?$"
+)
+_PAGE_REFERENCE = re.compile(r"\bpages?\s+(\d+)", re.IGNORECASE)
+# "on page 3", "of pages 2-4", ... removed before matching
+_PAGE_PHRASE = re.compile(r"\b(?:(?:on|of|for|in|from)\s+)?(?:the\s+)?pages?\s+\d+(?:\s*(?:-|to|and)\s*\d+)?")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+SYSTEM_PROMPT = (
+    "You summarize documents faithfully. Use only the text you are given; "
+    "do not add facts, page numbers or citations."
+)
+
+
+def is_summary_question(question: str, names: List[str] = ()) -> bool:
+    """
+    True for a request to summarize the document as a whole (optionally a
+    page or page range); names are the file names it may mention
+    """
+    text = (question or "").lower()
+    for name in sorted((n.lower() for n in names if n), key=len, reverse=True):
+        text = text.replace(name, " document ")
+    text = _PAGE_PHRASE.sub(" ", text)
+    text = re.sub(r"[?.!,:;\"]+", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return bool(text) and bool(_SUMMARY_QUESTION.match(text))
+
+
+def referenced_page(question: str) -> Optional[int]:
+    match = _PAGE_REFERENCE.search(question or "")
+    return int(match.group(1)) if match else None
+
+
+class DocumentSummarizer:
+    """
+    Map-reduce summarizer over a document's pages
+
+    Pages are grouped (pages_per_group, at most group_chars of text each)
+    and every group is summarized concurrently. Section summaries are then
+    merged `fanout` at a time until one document summary is left, and a
+    last short call turns that into suggested questions.
+
+    Without an LLM (or if a call fails) the affected piece falls back to
+    its lead sentences, so a summary always exists; `method` records
+    whether the document summary came from the LLM or is extractive.
+
+    Interview Note: Done once at ingest, this turns "Summarize X" from
+    top-k retrieval over a few arbitrary chunks (or a long-context call
+    over the whole file) into a cache lookup at question time.
+    """
+
+    def __init__(self, llm=None, pages_per_group: int = 5, group_chars: int = 12000, fanout: int = 8, suggestions: int = 3):
+        self.llm = llm
+        self.pages_per_group = max(1, pages_per_group)
+        self.group_chars = group_chars
+        self.fanout = max(2, fanout)
+        self.suggestions = suggestions
+
+    def summarize(self, pages: List[Dict]) -> Dict:
+        """
+        Returns:
+            {"summary": str, "method": "llm" | "extractive",
+             "sections": [{"pages": [first, last], "summary": str}],
+             "suggestions": [str]}
+        """
+        groups = [pages[i:i + self.pages_per_group] for i in range(0, len(pages), self.pages_per_group)]
+        with span("summarize", pages=len(pages), groups=len(groups)) as stage:
+            section_texts = self._parallel(self._summarize_group, groups)
+            sections = [
+                {"pages": [group[0]["page"], group[-1]["page"]], "summary": text}
+                for group, text in zip(groups, section_texts)
+            ]
+
+            # Merge level by level; one section is already the document summary
+            level = section_texts
+            method = "llm" if self.llm is not None else "extractive"
+            while len(level) > 1:
+                batches = [level[i:i + self.fanout] for i in range(0, len(level), self.fanout)]
+                merged = self._parallel(self._merge, batches)
+                level = [text for text, _ in merged]
+                method = merged[-1][1]
+            summary = level[0] if level else ""
+
+            suggestions = self._suggest(summary) if summary else []
+            stage["sections"] = len(sections)
+        return {"summary": summary, "method": method, "sections": sections, "suggestions": suggestions}
+
+    # -------------------------------
+    # MAP / REDUCE STEPS
+    # -------------------------------
+    def _summarize_group(self, group: List[Dict]) -> str:
+        text = " ".join(page["text"] for page in group)
+        if len(text) > self.group_chars:
+            text = text[:self.group_chars] + " [...]"
+        first, last = group[0]["page"], group[-1]["page"]
+        label = f"Page {first}" if first == last else f"Pages {first}-{last}"
+        prompt = f"{label} of a document:\n\n{text}\n\nSummarize these pages in 3-5 sentences."
+        return self._complete(prompt, max_tokens=300) or self._lead(text, 3)
+
+    def _merge(self, summaries: List[str]):
+        """(merged summary, "llm" | "extractive")"""
+        joined = "\n".join(f"- {s}" for s in summaries)
+        prompt = (
+            f"Consecutive section summaries of one document:\n\n{joined}\n\n"
+            "Write a summary of all of it: one paragraph of 4-6 sentences, then up to "
+            "5 bullet-point key takeaways."
+        )
+        merged = self._complete(prompt, max_tokens=500)
+        if merged:
+            return merged, "llm"
+        return " ".join(self._lead(s, 1) for s in summaries), "extractive"
+
+    def _suggest(self, summary: str) -> List[str]:
+        prompt = (
+            f"Document summary:\n\n{summary}\n\nWrite {self.suggestions} short questions a reader "
+            "could ask about this document, one per line, without numbering."
+        )
+        text = self._complete(prompt, max_tokens=150)
+        if not text:
+            return []
+        questions = [re.sub(r"^[\s\-*•\d.)]+", "", line).strip() for line in text.splitlines()]
+        return [q for q in questions if len(q) > 5][:self.suggestions]
+
+    # -------------------------------
+    # HELPERS
+    # -------------------------------
+    def _complete(self, prompt: str, max_tokens: int, attempts: int = 3) -> Optional[str]:
+        """LLM text, or None without an LLM / on failure (caller falls back to extractive)"""
+        if self.llm is None:
+            return None
+        for attempt in range(attempts):
+            try:
+                text = self.llm.complete(
+                    [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+                    temperature=0, max_tokens=max_tokens,
+                )
+                return text.strip() or None
+            except Overloaded as e:
+                # Background work: wait for capacity rather than store a degraded summary
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(e.retry_after)
+            except LLMUnavailable as e:
+                logger.warning("Summary call failed, using lead sentences", extra={"error": str(e)})
+                return None
+        return None
+
+    @staticmethod
+    def _lead(text: str, sentences: int) -> str:
+        return " ".join(_SENTENCE.split(text.strip())[:sentences])
+
+    @staticmethod
+    def _parallel(fn, items: List) -> List:
+        # copy_context: the calls keep the job's scheduler tenant / background lane
+        futures = [_SUMMARY_POOL.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [f.result() for f in futures]
@@ -1,116 +1,339 @@
 """
 Vector Store Module
-Production-ready Pinecone storage with multi-tenancy support (Namespaces)
+Production-ready Pinecone storage with multi-tenancy support (Namespaces),
+with an in-process local index as alternative backend
 """
 
 import os
 import json
 import uuid
+import hashlib
 import numpy as np
-from pinecone import Pinecone
-from typing import List, Tuple, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict, Optional
+
+from .local_index import LocalVectorIndex
+from .reduction import ReductionConfig
+from .scheduler import EMBED_SCHEDULER
+from .logger import get_logger
+from .metrics import span, observe_size
+
+logger = get_logger("vector_store")
+
+# Concurrent Pinecone queries for search_many (the index handle is thread-safe)
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_CONCURRENCY", 8)), thread_name_prefix="rag-search")
+# Concurrent Pinecone metadata updates across all re-indexing jobs, and per job
+_UPDATE_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("UPDATE_CONCURRENCY", 16)), thread_name_prefix="rag-update")
+UPDATE_CONCURRENCY_PER_CALL = int(os.getenv("UPDATE_CONCURRENCY_PER_CALL", 8))
 
 class VectorStore:
     """
     Hybrid Vector Database:
     - Uses Pinecone as primary storage
+    - Falls back to a local numpy index (VECTOR_BACKEND=local, or no Pinecone credentials)
     - Supports multi-tenancy (Namespaces architecture)
     """
     
-    def __init__(self, embedder):
+    def __init__(self, embedder, local_dir: Optional[str] = None):
         self.embedder = embedder
         self.dimension = embedder.embedding_dim
+        # Texts per embed call when indexing (batches span document boundaries)
+        self.embed_batch_size = int(os.getenv("EMBED_BATCH_SIZE", 512))
+        # Two-stage search: chunks of only the N documents nearest the query (0 = all documents)
+        self.doc_candidates = int(os.getenv("SEARCH_DOC_CANDIDATES", 0))
         self.use_pinecone = False
+        self.use_local = False
         self.index = None
         
         # Pinecone Connection Details
         self.api_key = os.getenv("PINECONE_API_KEY")
         self.index_name = os.getenv("PINECONE_INDEX_NAME")
+        backend = os.getenv("VECTOR_BACKEND", "auto").lower()
         
-        if self.api_key and self.index_name:
+        if backend != "local" and self.api_key and self.index_name:
+            if int(os.getenv("EMBED_REDUCE_DIM", 0)):
+                # Queries would be reduced while the index holds full-size vectors (or the reverse): refuse to start
+                raise ValueError(
+                    "EMBED_REDUCE_DIM applies to the local index only; with Pinecone set it to 0 "
+                    "(a Pinecone index keeps the dimension it was created with) or use VECTOR_BACKEND=local"
+                )
             try:
                 self._init_pinecone()
                 self.use_pinecone = True
-                print(f"✅ Successfully connected to Pinecone: {self.index_name}")
+                logger.info("Connected to Pinecone", extra={"index": self.index_name})
+                if self.doc_candidates:
+                    # Centroids are kept by the local index itself; Pinecone queries search the whole namespace
+                    logger.warning("SEARCH_DOC_CANDIDATES applies to the local index only; Pinecone queries search every chunk",
+                                   extra={"doc_candidates": self.doc_candidates})
             except Exception as e:
-                print(f"❌ Failed to connect to Pinecone: {e}")
-                print("⚠️ Vector storage is unavailable.")
-        else:
-            print("⚠️ Pinecone credentials missing in environment variables.")
+                logger.error("Failed to connect to Pinecone; vector storage is unavailable", extra={"error": str(e)})
+        elif backend == "pinecone":
+            logger.warning("Pinecone credentials missing in environment variables")
+
+        if not self.use_pinecone and backend != "pinecone":
+            self._init_local(local_dir)
+
+    def _init_local(self, local_dir: Optional[str]):
+        """Initialize the in-process index (persisted under local_dir if given)"""
+        threshold = float(os.getenv("LOCAL_INDEX_COMPACT_THRESHOLD", 0.2))
+        # Memory budget for resident tenant shards; colder ones are evicted to disk (0 = unbounded)
+        max_bytes = int(float(os.getenv("LOCAL_INDEX_MAX_MB", 1024)) * 1024 * 1024)
+        self.index = LocalVectorIndex(
+            self.dimension, persist_dir=local_dir, compact_threshold=threshold, max_bytes=max_bytes,
+            reduction=self._reduction_config(),
+        )
+        self.index_name = "local"
+        self.use_local = True
+        logger.info("Using local vector index", extra={"path": local_dir or "in-memory"})
+
+    @staticmethod
+    def _reduction_config() -> ReductionConfig:
+        """EMBED_REDUCE_* settings: per-namespace projection of stored / query vectors"""
+        return ReductionConfig(
+            dim=int(os.getenv("EMBED_REDUCE_DIM", 0)),
+            method=os.getenv("EMBED_REDUCE_METHOD", "pca").lower(),
+            min_vectors=int(os.getenv("EMBED_REDUCE_MIN_VECTORS", 1000)),
+            rescore=int(os.getenv("EMBED_RESCORE_FACTOR", 0)),
+        )
 
     def _init_pinecone(self):
         """Initialize Pinecone client and index"""
+        # Imported lazily: the client is only needed when Pinecone is configured
+        from pinecone import Pinecone
         pc = Pinecone(api_key=self.api_key)
         self.index = pc.Index(self.index_name)
 
-    def build_index(self, chunks: List[Dict], tenant_id: str = "default"):
+    @staticmethod
+    def chunk_vector_ids(chunks: List[Dict], document_id: str) -> List[str]:
+        """
+        Stable content-hash vector ids for a document's chunks
+
+        The same text in the same document always maps to the same id, so a
+        re-upload can be diffed against what is already indexed. Repeated
+        texts get an occurrence suffix to stay unique.
+        """
+        ids = []
+        seen = {}
+        for chunk in chunks:
+            digest = hashlib.sha1(chunk["text"].encode("utf-8")).hexdigest()[:20]
+            n = seen.get(digest, 0)
+            seen[digest] = n + 1
+            ids.append(f"{document_id}_{digest}" + (f"_{n}" if n else ""))
+        return ids
+
+    def build_index(
+        self,
+        chunks: List[Dict],
+        tenant_id: str = "default",
+        ids: List[str] = None,
+        document_id: str = None,
+        document_ids: List[str] = None,
+        embeddings: Optional[np.ndarray] = None,
+    ):
         """
         Index text chunks into Pinecone using Namespaces
+
+        Args:
+            chunks: Chunk dicts to embed and upsert
+            tenant_id: Pinecone namespace
+            ids: Vector ids (e.g. from chunk_vector_ids); random if omitted
+            document_id: Stored in metadata so a document's vectors can be found
+            document_ids: Per-chunk document ids (chunks from several documents
+                embedded and upserted together); overrides document_id
+            embeddings: Precomputed vectors aligned with chunks (e.g. pooled by
+                SemanticChunker); the chunks are then not embedded again
         """
-        if not self.use_pinecone:
-            print("⚠️ Pinecone not available. Cannot index.")
+        if self.index is None:
+            logger.warning("Vector storage not available. Cannot index.")
+            return
+        if not chunks:
             return
 
-        texts = [c["text"] for c in chunks]
-        embeddings = self.embedder.embed_texts(texts)
-        
-        print(f"🚀 Uploading {len(chunks)} vectors to Pinecone [{self.index_name}] in namespace [{tenant_id}]...")
-        
-        vectors = []
-        for i, chunk in enumerate(chunks):
-            # Clean metadata to avoid type errors in Pinecone (only allows str, int, float, bool, list of str)
-            clean_metadata = {
-                "text": chunk["text"],
-                "document_name": str(chunk.get("document_name", "unknown")),
-                "page": int(chunk.get("page", 0))
-            }
-            
-            # Merge additional metadata if present
-            if "metadata" in chunk and isinstance(chunk["metadata"], dict):
-                for k, v in chunk["metadata"].items():
-                    if isinstance(v, (str, int, float, bool)):
-                        clean_metadata[k] = v
-                    elif isinstance(v, list) and all(isinstance(x, str) for x in v):
-                        clean_metadata[k] = v
-            
-            vectors.append({
-                "id": f"{tenant_id}_{uuid.uuid4()}",
-                "values": embeddings[i].tolist(),
-                "metadata": clean_metadata
-            })
+        logger.info("Uploading vectors", extra={"count": len(chunks), "index": self.index_name, "namespace": tenant_id})
+
+        # Embed in large groups (one model call each, independent of document
+        # boundaries) and upsert each group before embedding the next, so
+        # memory stays bounded however many chunks are passed in
+        for start in range(0, len(chunks), self.embed_batch_size):
+            group = range(start, min(start + self.embed_batch_size, len(chunks)))
+            if embeddings is not None:
+                group_vectors = embeddings[group.start:group.stop]
+            else:
+                # Cost = texts, so one tenant's bulk ingest can't crowd out others' queries
+                with EMBED_SCHEDULER.slot(cost=len(group)):
+                    group_vectors = self.embedder.embed_texts([chunks[i]["text"] for i in group])
+            vectors = []
+            for row, i in enumerate(group):
+                doc = document_ids[i] if document_ids else document_id
+                vectors.append({
+                    "id": ids[i] if ids else f"{tenant_id}_{uuid.uuid4()}",
+                    "values": group_vectors[row].tolist(),
+                    "metadata": self._clean_metadata(chunks[i], doc),
+                })
+            self._upsert(vectors, tenant_id)
             
+        logger.info("Indexed chunks", extra={"count": len(chunks), "index": self.index_name})
+
+    @staticmethod
+    def _clean_metadata(chunk: Dict, document_id: Optional[str]) -> Dict:
+        # Clean metadata to avoid type errors in Pinecone (only allows str, int, float, bool, list of str)
+        clean_metadata = {
+            "text": chunk["text"],
+            "document_name": str(chunk.get("document_name", "unknown")),
+            "page": int(chunk.get("page", 0))
+        }
+        if document_id:
+            clean_metadata["document_id"] = document_id
+        
+        # Merge additional metadata if present
+        if "metadata" in chunk and isinstance(chunk["metadata"], dict):
+            for k, v in chunk["metadata"].items():
+                if isinstance(v, (str, int, float, bool)):
+                    clean_metadata[k] = v
+                elif isinstance(v, list) and all(isinstance(x, str) for x in v):
+                    clean_metadata[k] = v
+        return clean_metadata
+
+    def _upsert(self, vectors: List[Dict], tenant_id: str):
         # Pinecone upsert in batches of 100 to avoid request size limits
         batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            self.index.upsert(vectors=batch, namespace=tenant_id)
-            
-        print(f"✅ Successfully indexed {len(chunks)} chunks in Pinecone")
+        with span("upsert", vectors=len(vectors)):
+            for i in range(0, len(vectors), batch_size):
+                batch = vectors[i:i + batch_size]
+                observe_size("rag_upsert_batch_size", len(batch), backend="local" if self.use_local else "pinecone")
+                self.index.upsert(vectors=batch, namespace=tenant_id)
+
+    def delete_vectors(self, ids: List[str], tenant_id: str = "default"):
+        """Delete vectors by id within a namespace"""
+        if self.index is None or not ids:
+            return
+        # Pinecone accepts up to 1000 ids per delete call
+        batch_size = 1000
+        for i in range(0, len(ids), batch_size):
+            self.index.delete(ids=ids[i:i + batch_size], namespace=tenant_id)
+        logger.info("Deleted vectors", extra={"count": len(ids), "namespace": tenant_id})
+
+    def delete_document(self, document_id: str, tenant_id: str = "default", ids: List[str] = None):
+        """
+        Remove a document's vectors: tracked ids first, then a metadata filter
+        for anything untracked (filter deletes are unsupported on serverless
+        Pinecone, where the tracked ids are authoritative)
+        """
+        if self.index is None:
+            return
+        self.delete_vectors(ids or [], tenant_id=tenant_id)
+        try:
+            self.index.delete(filter={"document_id": {"$eq": document_id}}, namespace=tenant_id)
+        except Exception as e:
+            if not ids:
+                logger.warning("Filter delete unavailable", extra={"document_id": document_id, "error": str(e)})
+
+    def delete_namespace(self, tenant_id: str = "default"):
+        """Drop every vector in a tenant namespace"""
+        if self.index is None:
+            return
+        try:
+            self.index.delete(delete_all=True, namespace=tenant_id)
+        except Exception as e:
+            # Pinecone raises when the namespace doesn't exist
+            logger.warning("Could not clear namespace", extra={"namespace": tenant_id, "error": str(e)})
+
+    def update_pages(self, pages: Dict[str, int], tenant_id: str = "default"):
+        """
+        Metadata-only update for unchanged chunks that moved to another page
+
+        Pinecone updates one vector per call, and an insertion near the start
+        of a long document repages most later chunks, so the calls are fanned
+        out with at most UPDATE_CONCURRENCY_PER_CALL in flight for this job.
+        """
+        if self.index is None or not pages:
+            return
+
+        def apply(item):
+            vector_id, page = item
+            self.index.update(id=vector_id, set_metadata={"page": int(page)}, namespace=tenant_id)
+
+        with span("update_pages", vectors=len(pages)):
+            if self.use_local:
+                for item in pages.items():
+                    apply(item)
+                return
+            in_flight = deque()
+            for item in pages.items():
+                if len(in_flight) >= UPDATE_CONCURRENCY_PER_CALL:
+                    in_flight.popleft().result()
+                in_flight.append(_UPDATE_POOL.submit(apply, item))
+            for future in in_flight:
+                future.result()
 
     def search(self, query: str, top_k: int = 3, tenant_id: str = "default") -> Tuple[List[float], List[Dict]]:
         """
         Search for most similar chunks using Cosine Similarity within a namespace
         Returns: (scores, results)
         """
-        if not self.use_pinecone:
-            print("⚠️ Pinecone not available. Search failed.")
+        if self.index is None:
+            logger.warning("Vector storage not available. Search failed.")
             return [], []
 
-        query_embedding = self.embedder.embed_query(query)
+        with EMBED_SCHEDULER.slot():
+            query_embedding = self.embedder.embed_query(query)
         
         # Pinecone query
-        query_response = self.index.query(
-            vector=query_embedding.tolist(),
-            top_k=top_k,
-            include_metadata=True,
-            namespace=tenant_id
-        )
+        with span("search", top_k=top_k):
+            query_response = self.index.query(
+                vector=query_embedding.tolist(),
+                top_k=top_k,
+                include_metadata=True,
+                namespace=tenant_id,
+                **self._routing_args()
+            )
             
+        return self._to_results(query_response)
+
+    def search_many(self, queries: List[str], top_k: int = 3, tenant_id: str = "default") -> List[Tuple[List[float], List[Dict]]]:
+        """
+        Search several queries at once; one (scores, results) per query, in order
+
+        All queries are embedded in one batch. The local index scores them
+        with a single matrix product; Pinecone has no multi-vector query, so
+        the requests are issued concurrently instead of back to back.
+        """
+        if not queries:
+            return []
+        if self.index is None:
+            logger.warning("Vector storage not available. Search failed.")
+            return [([], []) for _ in queries]
+
+        with EMBED_SCHEDULER.slot(cost=len(queries)):
+            query_embeddings = self.embedder.embed_texts(queries)
+
+        with span("search", top_k=top_k, queries=len(queries)):
+            if hasattr(self.index, "query_many"):
+                responses = self.index.query_many(query_embeddings, top_k=top_k, namespace=tenant_id, **self._routing_args())
+            else:
+                responses = list(_SEARCH_POOL.map(
+                    lambda vector: self.index.query(
+                        vector=vector.tolist(), top_k=top_k, include_metadata=True, namespace=tenant_id
+                    ),
+                    query_embeddings,
+                ))
+
+        return [self._to_results(response) for response in responses]
+
+    def _routing_args(self) -> Dict:
+        # Document-centroid pruning is a local index feature (see SEARCH_DOC_CANDIDATES in .env.example);
+        # Pinecone takes no such argument and always searches the whole namespace
+        return {"documents": self.doc_candidates} if self.use_local and self.doc_candidates else {}
+
+    @staticmethod
+    def _to_results(query_response) -> Tuple[List[float], List[Dict]]:
         results = []
         scores = []
         for match in query_response["matches"]:
             metadata = match["metadata"]
             results.append({
+                "id": match.get("id"),
                 "text": metadata.get("text", ""),
                 "page": metadata.get("page", 0),
                 "metadata": metadata
@@ -119,8 +342,10 @@ class VectorStore:
             
         return scores, results
 
-    def save_index(self, path: str):
-        pass
+    def save_index(self, path: str = None, tenant_id: str = None):
+        """Persist the local index, one namespace or all (Pinecone persists server-side)"""
+        if self.use_local:
+            self.index.save(tenant_id)
 
     def load_index(self, path: str):
         pass
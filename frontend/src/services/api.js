@@ -60,11 +60,23 @@ export const resetIndex = async () => {
 };
 
 /**
- * Get all uploaded documents history
+ * Get all uploaded documents history (newest first)
+ * The endpoint is paginated, so pages are fetched until X-Total-Count is reached
  */
+const DOCUMENTS_PAGE_SIZE = 1000;
+
 export const getDocuments = async () => {
-    const response = await api.get('/documents');
-    return response.data;
+    const documents = [];
+    for (;;) {
+        const response = await api.get('/documents', {
+            params: { limit: DOCUMENTS_PAGE_SIZE, offset: documents.length },
+        });
+        documents.push(...response.data);
+        const total = parseInt(response.headers['x-total-count'], 10);
+        if (response.data.length < DOCUMENTS_PAGE_SIZE || Number.isNaN(total) || documents.length >= total) {
+            return documents;
+        }
+    }
 };
 
 /**